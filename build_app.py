@@ -153,6 +153,14 @@ exec "$PYTHON_CMD" "$PYTHON_SCRIPT"
     
     # Copy Python script and requirements
     shutil.copy2("menubar_transcriber.py", resources_dir)
+    shutil.copy2("transcrybe_batch.py", resources_dir)
+    shutil.copy2("transcrybe_cache.py", resources_dir)
+    shutil.copy2("transcrybe_core.py", resources_dir)
+    shutil.copy2("transcrybe_engines.py", resources_dir)
+    shutil.copy2("transcrybe_history.py", resources_dir)
+    shutil.copy2("transcrybe_archive.py", resources_dir)
+    shutil.copy2("transcrybe_metrics.py", resources_dir)
+    shutil.copy2("transcrybe_worker.py", resources_dir)
     shutil.copy2("requirements.txt", resources_dir)
     
     print(f"Created {app_name} bundle successfully!")
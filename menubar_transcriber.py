@@ -1,26 +1,45 @@
 #!/usr/bin/env python3
 """
 Menu bar speech-to-text transcriber that works system-wide
+
+This is the rumps/pynput shell; the recording and transcription pipeline
+lives in `transcrybe_core`.
 """
 
 import logging
 import os
 import subprocess
 import sys
-import tempfile
 import threading
 import time
 from datetime import datetime
 
-import numpy as np
-import pyperclip
+_STARTED = time.perf_counter()
+
+# Only what the menu bar needs up front; audio and hotkey libraries load on first use
 import rumps
-import scipy.io.wavfile as wavfile
-import sounddevice as sd
-import whisper
-from pynput import keyboard
-from pynput.keyboard import Key
 
+from transcrybe_core import (
+    CONFIG_PATH,
+    LANGUAGES,
+    MODEL_SIZES,
+    DictationPipeline,
+    load_config,
+    make_sink,
+    save_config,
+)
+from transcrybe_engines import ENGINES
+from transcrybe_metrics import METRICS, StartupProfile, import_times
+
+LIVE_REFRESH_SECONDS = 0.2  # How often the title shows the level and partial text
+LEVEL_BARS = "▁▂▃▄▅▆▇█"
+TITLE_TEXT_CHARS = 24
+
+
+def level_bar(db, floor=-60.0):
+    """One block character for a dBFS level"""
+    fraction = min(1.0, max(0.0, (db - floor) / -floor))
+    return LEVEL_BARS[round(fraction * (len(LEVEL_BARS) - 1))]
 
 def setup_logging():
     """Setup logging to write to user's home directory"""
@@ -40,33 +59,81 @@ def setup_logging():
     return log_file
 
 class TranscribeApp(rumps.App):
-    def __init__(self):
+    def __init__(self, startup_profile=False):
+        self.startup = StartupProfile(_STARTED)
+        self.startup.mark("imports")
+        self.print_startup_profile = startup_profile
         super(TranscribeApp, self).__init__("🎙️", quit_button=None)
         
         # Setup logging first
         self.log_file = setup_logging()
         logging.info("TranscribeApp initializing...")
         
-        self.model = None
-        self.is_recording = False
-        self.audio_data = []
-        self.temp_file = None
+        self.config = load_config()
         self.hotkeys = None
         
-        # Audio settings
-        self.CHANNELS = 1
-        self.RATE = 16000
+        # Searchable transcript history, written off the hot path
+        self.history = None
+        if self.config["history"]:
+            from transcrybe_history import HistoryStore
+            try:
+                self.history = HistoryStore()
+            except Exception as e:
+                logging.error(f"History store unavailable: {e}")
+        
+        # Recording, transcription and paste all live in the headless core
+        self.pipeline = DictationPipeline(
+            self.config, make_sink(self.config), on_done=self._dictation_done,
+            history=self.history, archive=self._make_archive(),
+        )
+        self.startup.mark("config and pipeline")
+        
+        # Per-stage latency metrics
+        if self.config["metrics_jsonl"]:
+            METRICS.jsonl_path = os.path.join(os.path.dirname(self.log_file), "metrics.jsonl")
+        if self.config["metrics_port"]:
+            try:
+                METRICS.serve(self.config["metrics_port"])
+            except OSError as e:
+                logging.warning(f"Metrics endpoint failed to start: {e}")
         
         # Menu items
+        self.live_item = rumps.MenuItem("Not recording")  # Live transcript while recording
         self.menu = [
+            self.live_item,
+            None,
             "Start Recording",
+            "Streaming Mode",
             None,  # Separator
             "Request Permissions",
-            "Settings",
+            "Stats",
+            "Search History…",
+            ("Settings", [
+                ("Engine", list(ENGINES)),
+                ("Model", MODEL_SIZES),
+                ("Language", list(LANGUAGES)),
+                ("Decoding", ["Greedy", "Beam Search (5)"]),
+                ("Compute Type", ["FP32", "FP16"]),
+                ("Output", ["Type", "Paste"]),
+                "Trim Silence",
+                "Keep Audio",
+                None,
+                "Open Config File",
+                "Reload Config",
+                "Help",
+            ]),
             "Show Log File",
             None,
             "Quit"
         ]
+        for engine in ENGINES:
+            self.menu["Settings"]["Engine"][engine].set_callback(self.select_engine)
+        for size in MODEL_SIZES:
+            self.menu["Settings"]["Model"][size].set_callback(self.select_model)
+        for name in LANGUAGES:
+            self.menu["Settings"]["Language"][name].set_callback(self.select_language)
+        self._update_settings_menu()
+        self.startup.mark("menu")
         
         # Request permissions on startup
         threading.Thread(target=self._request_permissions, daemon=True).start()
@@ -74,25 +141,107 @@ class TranscribeApp(rumps.App):
         # Load Whisper model in background
         threading.Thread(target=self._load_model, daemon=True).start()
         
+        # Free the model when unused or when memory gets tight
+        self.pipeline.watch_idle()
+        
         # Setup global hotkey
         self._setup_hotkey()
+        self.startup.mark("hotkey")
+        
+        # Fires once the run loop is up and the icon is visible
+        self._startup_timer = rumps.Timer(self._startup_finished, 0.01)
+        self._startup_timer.start()
+        
+        # Runs on the main thread for the app's lifetime; timers started from
+        # the hotkey thread would never fire
+        self._live_timer = rumps.Timer(self._refresh_live, LIVE_REFRESH_SECONDS)
+        self._live_timer.start()
+    
+    def _refresh_live(self, _):
+        """Show the input level and the partial transcript while recording"""
+        if not self.pipeline.is_recording:
+            return
+        bar = level_bar(self.pipeline.recorder.level())
+        partial = self.pipeline.partial_text
+        tail = partial[-TITLE_TEXT_CHARS:]
+        if len(partial) > TITLE_TEXT_CHARS:
+            tail = "…" + tail.lstrip()
+        self.title = f"🔴{bar} {tail}".rstrip()
+        self.live_item.title = ("…" + partial[-80:] if len(partial) > 80 else partial) or "Listening…"
+    
+    def _startup_finished(self, timer):
+        """Log how long each startup phase took"""
+        timer.stop()
+        self.startup.mark("run loop")
+        logging.info(self.startup.report())
+        if self.print_startup_profile:
+            print(self.startup.report())
+            print("Slowest imports (cumulative, self):")
+            for name, own, cumulative in import_times("menubar_transcriber"):
+                print(f"  {name:<40} {cumulative:.3f}s  {own:.3f}s")
+            rumps.quit_application()
     
     def _load_model(self):
-        """Load Whisper model in background"""
+        """Load the configured speech model in background"""
+        engine, name = self.pipeline.transcriber.configured_key()[:2]
         try:
-            logging.info("Loading Whisper model...")
-            rumps.notification("Transcrybe", "Loading speech model...", "")
-            self.model = whisper.load_model("base")
-            self.title = "🎙️"  # Ready indicator
-            logging.info("Whisper model loaded successfully")
-            rumps.notification("Transcrybe", "Ready!", "Press Cmd+Shift+Space to record")
+            if not self.pipeline.transcriber.ready:
+                rumps.notification("Transcrybe", f"Loading {name} speech model...", "")
+            if self.pipeline.transcriber.load():
+                self.title = "🎙️"  # Ready indicator
+                rumps.notification("Transcrybe", "Ready!", f"Using {name} model. Press Cmd+Shift+Space to record")
         except Exception as e:
-            logging.error(f"Failed to load Whisper model: {e}")
+            logging.error(f"Failed to load {engine} model '{name}': {e}")
             rumps.notification("Transcrybe", "Error", f"Failed to load model: {e}")
     
+    def _update_settings_menu(self):
+        """Reflect the current config in menu checkmarks"""
+        settings = self.menu["Settings"]
+        for engine in ENGINES:
+            settings["Engine"][engine].state = engine == self.config["engine"]
+        for size in MODEL_SIZES:
+            settings["Model"][size].state = size == self.config["model"]
+        for name, code in LANGUAGES.items():
+            settings["Language"][name].state = code == self.config["language"]
+        settings["Decoding"]["Greedy"].state = not self.config["beam_size"]
+        settings["Decoding"]["Beam Search (5)"].state = bool(self.config["beam_size"])
+        settings["Compute Type"]["FP32"].state = not self.config["fp16"]
+        settings["Compute Type"]["FP16"].state = self.config["fp16"]
+        settings["Output"]["Type"].state = self.config["output"] == "type"
+        settings["Output"]["Paste"].state = self.config["output"] == "paste"
+        settings["Trim Silence"].state = self.config["vad"]
+        settings["Keep Audio"].state = self.config["archive_audio"]
+        self.menu["Streaming Mode"].state = self.config["streaming"]
+    
+    def _make_archive(self):
+        """Audio archive for history entries, if turned on"""
+        if not (self.config["archive_audio"] and self.history):
+            return None
+        from transcrybe_archive import AudioArchive
+        return AudioArchive(format=self.config["archive_format"], max_bytes=self.config["archive_max_mb"] << 20)
+    
+    def _apply_config(self):
+        """Persist settings and hot-swap the model if it changed"""
+        save_config(self.config)
+        self._update_settings_menu()
+        self.pipeline.sink = make_sink(self.config)
+        if not self.config["archive_audio"]:
+            self.pipeline.archive = None
+        elif self.pipeline.archive:
+            self.pipeline.archive.max_bytes = self.config["archive_max_mb"] << 20
+        else:
+            self.pipeline.archive = self._make_archive()
+        transcriber = self.pipeline.transcriber
+        if transcriber.configured_key() != transcriber.engine_key:
+            threading.Thread(target=self._load_model, daemon=True).start()
+    
     def _request_permissions(self):
         """Request necessary permissions by triggering system dialogs"""
         logging.info("Requesting system permissions...")
+        import numpy as np
+        import sounddevice as sd
+        from pynput import keyboard
+        
         stream = None
         test_hotkeys = None
         permissions_status = {}
@@ -167,6 +316,8 @@ class TranscribeApp(rumps.App):
     
     def _setup_hotkey(self):
         """Setup global hotkey listener"""
+        from pynput import keyboard
+        
         try:
             logging.info("Setting up global hotkey: Cmd+Shift+Space")
             self.hotkeys = keyboard.GlobalHotKeys({
@@ -181,12 +332,8 @@ class TranscribeApp(rumps.App):
     def _toggle_recording(self):
         """Toggle recording on/off"""
         logging.info("Hotkey triggered: toggle recording")
-        if not self.model:
-            logging.warning("Recording toggle failed: model not loaded yet")
-            rumps.notification("Transcrybe", "Not Ready", "Model still loading...")
-            return
-            
-        if self.is_recording:
+        # Recording works before the model is loaded; decoding waits for it
+        if self.pipeline.is_recording:
             logging.info("Stopping recording...")
             self._stop_recording()
         else:
@@ -195,163 +342,193 @@ class TranscribeApp(rumps.App):
     
     def _start_recording(self):
         """Start recording"""
-        if self.is_recording:
+        if self.pipeline.is_recording:
             return
-            
-        self.is_recording = True
-        self.audio_data = []
-        self.title = "🔴"  # Recording indicator
         
-        rumps.notification("Transcrybe", "Recording", "Speak now...")
+        try:
+            self.pipeline.start()
+        except Exception as e:
+            logging.error(f"Recording failed: {e}")
+            rumps.notification("Transcrybe", "Error", f"Recording failed: {e}")
+            return
         
-        # Record in background thread
-        threading.Thread(target=self._record_audio, daemon=True).start()
+        self.title = "🔴"  # Recording indicator, updated with level and partial text
+        self.live_item.title = "Listening…"
+        rumps.notification("Transcrybe", "Recording", "Speak now...")
     
     def _stop_recording(self):
         """Stop recording and transcribe"""
-        if not self.is_recording:
+        if not self.pipeline.is_recording:
             return
-            
-        self.is_recording = False
+        
+        self.pipeline.stop()
         self.title = "⏳"  # Processing indicator
+        self.live_item.title = "Transcribing…"
         
-        # Process in background thread
-        threading.Thread(target=self._process_recording, daemon=True).start()
-    
-    def _record_audio(self):
-        """Record audio data"""
-        stream = None
-        try:
-            stream = sd.InputStream(samplerate=self.RATE, channels=self.CHANNELS, dtype=np.float32)
-            stream.start()
-            
-            while self.is_recording:
-                try:
-                    audio_chunk, _ = stream.read(1024)
-                    self.audio_data.append(audio_chunk)
-                    time.sleep(0.01)
-                except sd.PortAudioError:
-                    break
-        except Exception as e:
-            rumps.notification("Transcrybe", "Error", f"Recording failed: {e}")
-        finally:
-            if stream:
-                try:
-                    stream.stop()
-                    stream.close()
-                except:
-                    pass
+        # Transcribed in order on the pipeline's worker; the next recording can start now
+        self.pipeline.submit()
     
-    def _process_recording(self):
-        """Process recorded audio and transcribe"""
-        try:
-            if not self.audio_data:
-                self.title = "🎙️"
-                rumps.notification("Transcrybe", "Error", "No audio recorded")
-                return
-            
-            # Save audio file
-            self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            audio_array = np.concatenate(self.audio_data, axis=0)
-            audio_int16 = (audio_array * 32767).astype(np.int16)
-            wavfile.write(self.temp_file.name, self.RATE, audio_int16)
-            
-            # Transcribe
-            result = self.model.transcribe(self.temp_file.name, fp16=False)
-            text = result["text"].strip()
-            
-            if text:
-                # Copy to clipboard
-                pyperclip.copy(text)
-                
-                # Try multiple pasting methods
-                pasted = False
-                
-                # Method 1: pynput
-                try:
-                    logging.info(f"Attempting pynput paste for: {text[:50]}...")
-                    kb = keyboard.Controller()
-                    time.sleep(0.1)
-                    with kb.pressed(Key.cmd):
-                        kb.press('v')
-                        kb.release('v')
-                    time.sleep(0.1)  # Give it time to paste
-                    pasted = True
-                    logging.info("pynput paste succeeded")
-                    rumps.notification("Transcrybe", "Success!", f"Pasted: {text}")
-                except Exception as e:
-                    logging.warning(f"pynput paste failed: {e}")
-                
-                # Method 2: Try with longer delay
-                if not pasted:
-                    try:
-                        logging.info("Attempting second paste method...")
-                        time.sleep(0.5)
-                        kb = keyboard.Controller()
-                        kb.tap(Key.cmd, modifier=Key.cmd)  # Different approach
-                        kb.tap('v')
-                        pasted = True
-                        logging.info("Second paste method succeeded")
-                        rumps.notification("Transcrybe", "Success!", f"Pasted: {text}")
-                    except Exception as e:
-                        logging.warning(f"Second paste method failed: {e}")
-                
-                # Method 3: Direct keystroke
-                if not pasted:
-                    try:
-                        logging.info("Attempting Quartz paste method...")
-                        import Quartz
-
-                        # Create key down event for Cmd+V
-                        cmd_down = Quartz.CGEventCreateKeyboardEvent(None, 55, True)  # Cmd key
-                        v_down = Quartz.CGEventCreateKeyboardEvent(None, 9, True)   # V key
-                        v_up = Quartz.CGEventCreateKeyboardEvent(None, 9, False)
-                        cmd_up = Quartz.CGEventCreateKeyboardEvent(None, 55, False)
-                        
-                        # Set Cmd modifier on V key events
-                        Quartz.CGEventSetFlags(v_down, Quartz.kCGEventFlagMaskCommand)
-                        Quartz.CGEventSetFlags(v_up, Quartz.kCGEventFlagMaskCommand)
-                        
-                        # Post events
-                        Quartz.CGEventPost(Quartz.kCGHIDEventTap, cmd_down)
-                        Quartz.CGEventPost(Quartz.kCGHIDEventTap, v_down)
-                        Quartz.CGEventPost(Quartz.kCGHIDEventTap, v_up)
-                        Quartz.CGEventPost(Quartz.kCGHIDEventTap, cmd_up)
-                        
-                        pasted = True
-                        logging.info("Quartz paste succeeded")
-                        rumps.notification("Transcrybe", "Success!", f"Pasted: {text}")
-                    except Exception as e:
-                        logging.warning(f"Quartz paste failed: {e}")
-                
-                if not pasted:
-                    logging.warning("All paste methods failed - text copied to clipboard")
-                    rumps.notification("Transcrybe", "Copied to Clipboard", f"Press Cmd+V to paste: {text}")
+    def _dictation_done(self, job):
+        """Report a finished dictation from the pipeline's worker thread"""
+        if not self.pipeline.is_recording:
+            self.title = "⏳" if self.pipeline.pending else "🎙️"
+            if not self.pipeline.pending:
+                self.live_item.title = f"Last: {job.text[:60]}" if job.text else "Not recording"
+        
+        if job.error:
+            rumps.notification("Transcrybe", "Error", f"Processing failed: {job.error}")
+        elif not job.duration:
+            rumps.notification("Transcrybe", "Error", "No audio recorded")
+        elif job.text:
+            if job.delivered:
+                rumps.notification("Transcrybe", "Success!", f"Pasted: {job.text}")
             else:
-                rumps.notification("Transcrybe", "No Speech", "No speech detected")
-            
-            self.title = "🎙️"  # Ready
-            
-        except Exception as e:
-            self.title = "🎙️"
-            rumps.notification("Transcrybe", "Error", f"Processing failed: {e}")
-        finally:
-            # Cleanup
-            if self.temp_file and os.path.exists(self.temp_file.name):
-                os.unlink(self.temp_file.name)
+                rumps.notification("Transcrybe", "Copied to Clipboard", f"Press Cmd+V to paste: {job.text}")
+        else:
+            rumps.notification("Transcrybe", "No Speech", "No speech detected")
     
     @rumps.clicked("Start Recording")
     def start_recording_menu(self, _):
         """Menu item to start recording"""
         self._toggle_recording()
     
+    @rumps.clicked("Streaming Mode")
+    def toggle_streaming(self, sender):
+        """Toggle transcribing while recording"""
+        self.config["streaming"] = not self.config["streaming"]
+        logging.info(f"Streaming mode {'enabled' if self.config['streaming'] else 'disabled'}")
+        self._apply_config()
+    
     @rumps.clicked("Request Permissions")
     def request_permissions_menu(self, _):
         """Manually request permissions"""
         self._request_permissions()
         rumps.alert("Permissions", "Permission dialogs should appear.\n\nIf not, manually grant:\n1. Microphone access\n2. Accessibility access\n3. Input Monitoring access\n\nIn System Settings → Privacy & Security")
     
-    @rumps.clicked("Settings")
+    @rumps.clicked("Search History…")
+    def search_history(self, _):
+        """Search past transcripts and optionally copy the newest match"""
+        from transcrybe_history import format_entry
+        
+        if not self.history:
+            rumps.alert("Search History", 'History is turned off ("history": false in the config file).')
+            return
+        response = rumps.Window(
+            "Words to search for, or leave empty for the latest transcripts",
+            "Search History", ok="Search", cancel="Cancel", dimensions=(320, 24),
+        ).run()
+        if not response.clicked:
+            return
+        
+        query = response.text.strip()
+        entries = self.history.search(query, 10) if query else self.history.recent(10)
+        if not entries:
+            rumps.alert("Search History", "No matching transcripts.")
+            return
+        if rumps.alert("Search History", "\n\n".join(format_entry(entry) for entry in entries),
+                       ok="Copy First", cancel="Close"):
+            import pyperclip
+            pyperclip.copy(entries[0]["text"])
+    
+    @rumps.clicked("Stats")
+    def show_stats(self, _):
+        """Show p50/p95 latency per pipeline stage"""
+        summary = METRICS.summary()
+        if not summary:
+            rumps.alert("Stats", "No dictations yet this session.")
+            return
+        lines = [
+            f"{stage}: p50 {stats['p50'] * 1000:.0f} ms, p95 {stats['p95'] * 1000:.0f} ms ({stats['count']})"
+            for stage, stats in summary.items()
+        ]
+        lines.append(f"Dictations queued: {self.pipeline.pending}")
+        rumps.alert("Stats", "\n".join(lines))
+    
+    def select_engine(self, sender):
+        """Switch to the engine picked in Settings → Engine"""
+        logging.info(f"Engine changed to {sender.title}")
+        self.config["engine"] = sender.title
+        self._apply_config()
+    
+    def select_model(self, sender):
+        """Switch to the model picked in Settings → Model"""
+        logging.info(f"Model changed to {sender.title}")
+        self.config["model"] = sender.title
+        self._apply_config()
+    
+    def select_language(self, sender):
+        """Pin the language picked in Settings → Language, or go back to detecting it"""
+        logging.info(f"Language changed to {sender.title}")
+        self.config["language"] = LANGUAGES[sender.title]
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Decoding", "Greedy")
+    def select_greedy(self, _):
+        """Use greedy decoding"""
+        self.config["beam_size"] = None
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Decoding", "Beam Search (5)")
+    def select_beam_search(self, _):
+        """Use beam search decoding"""
+        self.config["beam_size"] = 5
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Compute Type", "FP32")
+    def select_fp32(self, _):
+        """Decode in float32"""
+        self.config["fp16"] = False
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Compute Type", "FP16")
+    def select_fp16(self, _):
+        """Decode in float16"""
+        self.config["fp16"] = True
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Output", "Type")
+    def select_type_output(self, _):
+        """Type transcripts as key events, partials included"""
+        self.config["output"] = "type"
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Output", "Paste")
+    def select_paste_output(self, _):
+        """Paste transcripts through the clipboard"""
+        self.config["output"] = "paste"
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Trim Silence")
+    def toggle_vad(self, _):
+        """Toggle dropping silence before decoding"""
+        self.config["vad"] = not self.config["vad"]
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Keep Audio")
+    def toggle_archive(self, _):
+        """Toggle archiving compressed audio with each history entry"""
+        if not self.history:
+            rumps.alert("Keep Audio", 'Audio is kept alongside the history, which is turned off ("history": false in the config file).')
+            return
+        self.config["archive_audio"] = not self.config["archive_audio"]
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Open Config File")
+    def open_config_file(self, _):
+        """Open the config file in the default editor"""
+        if not os.path.exists(CONFIG_PATH):
+            save_config(self.config)
+        subprocess.run(["open", CONFIG_PATH])
+    
+    @rumps.clicked("Settings", "Reload Config")
+    def reload_config(self, _):
+        """Pick up edits made to the config file"""
+        # Update in place, the pipeline shares this dict
+        self.config.update(load_config())
+        logging.info(f"Config reloaded: {self.config}")
+        self._apply_config()
+    
+    @rumps.clicked("Settings", "Help")
     def settings(self, _):
         """Show settings info"""
         rumps.alert("Settings", "Global Hotkey: Cmd+Shift+Space\n\nIf auto-paste isn't working:\n1. Click 'Request Permissions' above\n2. Grant all requested permissions\n3. Restart the app")
@@ -366,7 +543,7 @@ class TranscribeApp(rumps.App):
     def quit_app(self, _):
         """Quit application"""
         # Stop recording if active
-        self.is_recording = False
+        self.pipeline.stop()
         
         # Stop hotkey listener
         if self.hotkeys:
@@ -374,19 +551,26 @@ class TranscribeApp(rumps.App):
                 self.hotkeys.stop()
             except:
                 pass
-        
-        # Cleanup temp file
-        if self.temp_file and os.path.exists(self.temp_file.name):
-            try:
-                os.unlink(self.temp_file.name)
-            except:
-                pass
                 
         rumps.quit_application()
 
 def main():
     """Main entry point for the application"""
-    app = TranscribeApp()
+    if sys.argv[1:2] == ["batch"]:
+        from transcrybe_batch import main as batch_main
+        batch_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["history"]:
+        from transcrybe_history import main as history_main
+        history_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["archive"]:
+        from transcrybe_archive import main as archive_main
+        archive_main(sys.argv[2:])
+        return
+    
+    # Print a startup-time breakdown, including the slowest imports, then quit
+    app = TranscribeApp(startup_profile="--startup-profile" in sys.argv[1:])
     app.run()
 
 if __name__ == "__main__":
@@ -24,10 +24,28 @@ setup(
     author="Silas Rhyneer",
     python_requires=">=3.8",
     install_requires=read_requirements(),
-    py_modules=["menubar_transcriber"],
+    extras_require={
+        "faster-whisper": ["faster-whisper"],
+        "whisper-cpp": ["pywhispercpp"],
+    },
+    py_modules=[
+        "menubar_transcriber",
+        "transcrybe_batch",
+        "transcrybe_bench",
+        "transcrybe_cache",
+        "transcrybe_core",
+        "transcrybe_engines",
+        "transcrybe_history",
+        "transcrybe_archive",
+        "transcrybe_metrics",
+        "transcrybe_worker",
+    ],
     entry_points={
         'console_scripts': [
             'transcrybe=menubar_transcriber:main',
+            'transcrybe-core=transcrybe_core:main',
+            'transcrybe-bench=transcrybe_bench:main',
+            'transcrybe-worker=transcrybe_worker:main',
         ],
     },
     classifiers=[
@@ -0,0 +1,74 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+import transcrybe_archive
+from transcrybe_archive import AudioArchive
+from transcrybe_history import HistoryStore
+
+RATE = 16000
+
+
+@pytest.fixture
+def wav_archive(monkeypatch, tmp_path):
+    """Archive without ffmpeg, so it falls back to WAV"""
+    monkeypatch.setattr(transcrybe_archive, "find_ffmpeg", lambda: None)
+
+    def make(max_bytes=1 << 20):
+        return AudioArchive(str(tmp_path / "audio"), max_bytes=max_bytes)
+    return make
+
+
+def second_of_audio():
+    return np.sin(np.arange(RATE) / 10).astype(np.float32) * 0.5
+
+
+def test_without_ffmpeg_recordings_are_kept_as_wav(wav_archive):
+    archive = wav_archive()
+    audio = second_of_audio()
+
+    name = archive.add(audio, RATE)
+    audio[:] = 0  # The archive copied the samples
+    archive.flush()
+
+    assert name.endswith(".wav")
+    with wave.open(archive.path(name)) as f:
+        assert f.getframerate() == RATE
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    assert len(samples) == RATE and np.abs(samples).max() > 10000
+    assert archive.usage() == (1, os.path.getsize(archive.path(name)))
+
+
+def test_oldest_recordings_are_evicted_over_the_cap(wav_archive):
+    # Each second of 16-bit WAV is a little over 32 KB, so two fit
+    archive = wav_archive(max_bytes=70000)
+    names = []
+    for _ in range(3):
+        names.append(archive.add(second_of_audio(), RATE))
+        archive.flush()
+
+    assert not os.path.exists(archive.path(names[0]))
+    assert all(os.path.exists(archive.path(name)) for name in names[1:])
+    files, size = archive.usage()
+    assert files == 2 and size <= 70000
+
+
+def test_the_newest_recording_is_kept_even_when_over_the_cap(wav_archive):
+    archive = wav_archive(max_bytes=1000)
+    name = archive.add(second_of_audio(), RATE)
+    archive.flush()
+    assert os.path.exists(archive.path(name))
+
+
+def test_update_keeps_the_search_index_in_sync(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.add("recognise wreck a nice beach", audio="clip.opus")
+    store.flush()
+    entry = store.with_audio()[0]
+
+    store.update(entry["id"], text="recognize speech", model="medium")
+
+    assert store.search("beach") == []
+    assert store.search("speech")[0]["model"] == "medium"
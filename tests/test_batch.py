@@ -0,0 +1,117 @@
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import transcrybe_batch
+import transcrybe_core
+from transcrybe_batch import _output_names, format_srt, load_manifest
+from transcrybe_core import DEFAULT_CONFIG, SAMPLE_RATE
+from transcrybe_engines import TranscriptionEngine
+
+
+class CountingEngine(TranscriptionEngine):
+    calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(len(audio))
+        return {"text": f"{len(audio)} samples", "language": "en",
+                "segments": [{"start": 0.0, "end": len(audio) / SAMPLE_RATE, "text": " whole clip"}]}
+
+
+def write_wav(path, seconds):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.full(int(seconds * SAMPLE_RATE), 1000, dtype=np.int16).tobytes())
+    return path
+
+
+def test_directories_keep_their_structure(tmp_path):
+    write_wav(str(tmp_path / "memos" / "a.wav"), 0.1)
+    write_wav(str(tmp_path / "memos" / "2024" / "b.wav"), 0.1)
+
+    names = _output_names([str(tmp_path / "memos")])
+
+    assert sorted(names.values()) == [os.path.join("2024", "b"), "a"]
+
+
+def test_same_named_files_get_distinct_outputs(tmp_path):
+    first = write_wav(str(tmp_path / "a" / "memo.wav"), 0.1)
+    second = write_wav(str(tmp_path / "b" / "memo.wav"), 0.1)
+    other = write_wav(str(tmp_path / "other.wav"), 0.1)
+
+    names = _output_names([first, second, other])
+
+    assert names == {first: os.path.join("a", "memo"), second: os.path.join("b", "memo"), other: "other"}
+
+
+def test_srt_timestamps_and_numbering():
+    srt = format_srt([
+        {"start": 0.0, "end": 1.5, "text": "Hello"},
+        {"start": 3661.25, "end": 3662.0, "text": "there"},
+    ])
+    assert srt == (
+        "1\n00:00:00,000 --> 00:00:01,500\nHello\n\n"
+        "2\n01:01:01,250 --> 01:01:02,000\nthere\n"
+    )
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    # Threads instead of processes, so the stub engine is visible to the workers
+    monkeypatch.setattr(transcrybe_batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: CountingEngine())
+    monkeypatch.setattr(transcrybe_core.WorkerClient, "connect", lambda *args, **kwargs: None)
+    monkeypatch.setattr(transcrybe_batch, "load_config", lambda: dict(DEFAULT_CONFIG, cache=False, warmup=False))
+    CountingEngine.calls = []
+    return CountingEngine.calls
+
+
+def test_resumes_from_the_manifest(batch, tmp_path):
+    inputs = str(tmp_path / "in")
+    write_wav(os.path.join(inputs, "a.wav"), 1)
+    changed = write_wav(os.path.join(inputs, "b.wav"), 2)
+    output = str(tmp_path / "out")
+    args = [inputs, "-o", output, "-f", "txt", "srt", "-w", "2"]
+
+    transcrybe_batch.main(args)
+    assert sorted(batch) == [SAMPLE_RATE, 2 * SAMPLE_RATE]
+    with open(os.path.join(output, "b.txt")) as f:
+        assert f.read() == f"{2 * SAMPLE_RATE} samples\n"
+    assert os.path.exists(os.path.join(output, "a.srt"))
+    assert len(load_manifest(os.path.join(output, "manifest.jsonl"))) == 2
+
+    transcrybe_batch.main(args)
+    assert len(batch) == 2  # Nothing left to do
+
+    write_wav(changed, 3)
+    os.utime(changed, (1, 1))
+    transcrybe_batch.main(args)
+    assert batch[2:] == [3 * SAMPLE_RATE]
+
+
+def test_workers_split_the_cores(batch, monkeypatch, tmp_path):
+    threads = []
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args: threads.append(args[3]) or CountingEngine())
+    write_wav(str(tmp_path / "in" / "a.wav"), 1)
+
+    transcrybe_batch.main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "-w", "2"])
+
+    assert threads and set(threads) == {4}
+
+
+def test_memory_pressure_does_not_swap_the_model(batch, monkeypatch, tmp_path):
+    models = []
+    monkeypatch.setattr(transcrybe_core, "memory_pressure", lambda: transcrybe_core.PRESSURE_CRITICAL)
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args: models.append(args[1]) or CountingEngine())
+    write_wav(str(tmp_path / "in" / "a.wav"), 1)
+
+    transcrybe_batch.main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "-w", "1", "--model", "small"])
+
+    assert models == ["small"]
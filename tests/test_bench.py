@@ -0,0 +1,26 @@
+import threading
+import time
+
+from transcrybe_bench import StageTimer
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def work_on_another_thread():
+    thread = threading.Thread(target=spin, args=(0.2,))
+    thread.start()
+    thread.join()
+
+
+def test_process_clock_counts_cpu_time_on_other_threads():
+    timer = StageTimer()
+    timer.wrap("thread", work_on_another_thread)()
+    timer.wrap("process", work_on_another_thread, time.process_time)()
+
+    assert timer.stages["thread"]["cpu"] < 0.05
+    assert timer.stages["process"]["cpu"] > 0.1
+    assert timer.stages["process"]["calls"] == 1
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from transcrybe_core import AudioBuffer, CaptureEngine
+
+
+def test_buffer_keeps_the_newest_samples_when_it_wraps():
+    buffer = AudioBuffer(10)
+    buffer.write(np.arange(7, dtype=np.float32))
+    buffer.write(np.arange(7, 14, dtype=np.float32))
+
+    assert buffer.written == 14
+    assert len(buffer) == 10
+    assert buffer.start == buffer.dropped == 4
+    np.testing.assert_array_equal(buffer.view(), np.arange(4, 14))
+    np.testing.assert_array_equal(buffer.read(6, 12), np.arange(6, 12))
+
+
+def test_buffer_reads_are_clamped_to_what_is_held():
+    buffer = AudioBuffer(10)
+    buffer.write(np.arange(25, dtype=np.float32))  # Larger than the capacity
+
+    np.testing.assert_array_equal(buffer.read(0, 100), np.arange(15, 25))
+    assert len(buffer.read(30, 40)) == 0
+
+
+def test_buffer_view_is_zero_copy_unless_wrapped():
+    buffer = AudioBuffer(10)
+    buffer.write(np.arange(6, dtype=np.float32))
+    assert np.shares_memory(buffer.view(), buffer._data)
+
+    buffer.write(np.arange(6, dtype=np.float32))
+    assert not np.shares_memory(buffer.view(), buffer._data)
+
+
+def test_clear_forgets_samples_but_keeps_storage():
+    buffer = AudioBuffer(10)
+    storage = buffer._data
+    buffer.write(np.ones(4, dtype=np.float32))
+    buffer.clear()
+
+    assert not buffer
+    assert len(buffer.view()) == 0
+    assert buffer._data is storage
+
+
+def test_capture_callback_writes_blocks_and_counts_xruns():
+    buffer = AudioBuffer(100)
+    capture = CaptureEngine(buffer, 16000)
+    ok = SimpleNamespace(input_overflow=False, input_underflow=False)
+    overflow = SimpleNamespace(input_overflow=True, input_underflow=False)
+
+    capture._callback(np.arange(5, dtype=np.float32)[:, None], 5, None, ok)
+    capture._callback(np.arange(5, 8, dtype=np.float32)[:, None], 3, None, overflow)
+
+    np.testing.assert_array_equal(buffer.view(), np.arange(8))
+    assert capture.overflows == 1 and capture.underflows == 0
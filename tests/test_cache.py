@@ -0,0 +1,60 @@
+import os
+import time
+
+import numpy as np
+
+from transcrybe_cache import TranscriptCache
+
+
+def result(n):
+    return {"text": f"transcript {n} " + "x" * 100}
+
+
+def disk_keys(directory):
+    return sorted(name[:-5] for _, _, names in os.walk(directory) for name in names if name.endswith(".json"))
+
+
+def test_key_depends_on_audio_engine_and_options():
+    audio = np.zeros(160, dtype=np.float32)
+    key = TranscriptCache.key(audio, ("whisper", "base", None), {"beam_size": 0})
+
+    assert key == TranscriptCache.key(audio.copy(), ("whisper", "base", None), {"beam_size": 0})
+    assert key != TranscriptCache.key(audio + 0.1, ("whisper", "base", None), {"beam_size": 0})
+    assert key != TranscriptCache.key(audio, ("whisper", "small", None), {"beam_size": 0})
+    assert key != TranscriptCache.key(audio, ("whisper", "base", None), {"beam_size": 5})
+
+
+def test_round_trip_through_disk(tmp_path):
+    TranscriptCache(str(tmp_path)).put("aa11", result(1))
+    assert TranscriptCache(str(tmp_path)).get("aa11") == result(1)
+
+
+def test_evicts_least_recently_used_past_the_size_cap(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=300, memory_entries=0)
+    cache.put("aa01", result(1))
+    cache.put("aa02", result(2))
+    cache.get("aa01")  # Now the most recently used
+    cache.put("aa03", result(3))
+
+    assert disk_keys(tmp_path) == ["aa01", "aa03"]
+    assert cache.get("aa02") is None
+    assert cache.get("aa01") == result(1)
+
+
+def test_index_rebuilt_on_restart_evicts_oldest_files(tmp_path):
+    cache = TranscriptCache(str(tmp_path))
+    for n in range(3):
+        cache.put(f"aa0{n}", result(n))
+        path = cache._path(f"aa0{n}")
+        os.utime(path, (time.time() - 100 + n, time.time() - 100 + n))
+
+    restarted = TranscriptCache(str(tmp_path), max_bytes=300, memory_entries=0)
+    restarted.put("aa09", result(9))
+
+    assert disk_keys(tmp_path) == ["aa02", "aa09"]
+
+
+def test_timings_are_not_cached(tmp_path):
+    cache = TranscriptCache(str(tmp_path))
+    cache.put("aa11", {"text": "hi", "timings": {"decode": 0.1}})
+    assert TranscriptCache(str(tmp_path)).get("aa11") == {"text": "hi"}
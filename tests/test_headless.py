@@ -0,0 +1,74 @@
+import wave
+
+import numpy as np
+import pytest
+
+import transcrybe_core
+from transcrybe_core import DEFAULT_CONFIG, SAMPLE_RATE, DictationPipeline, OutputSink, Recorder, Transcriber
+from transcrybe_engines import TranscriptionEngine
+
+
+class LengthEngine(TranscriptionEngine):
+    """Reports how much audio it was given"""
+
+    def transcribe(self, audio, **options):
+        return {"text": f" {len(audio)} samples ", "segments": []}
+
+
+class ListSink(OutputSink):
+    def __init__(self):
+        self.texts = []
+
+    def write(self, text):
+        self.texts.append(text)
+        return True
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: LengthEngine())
+    monkeypatch.setattr(transcrybe_core.WorkerClient, "connect", lambda *args, **kwargs: None)
+    config = dict(DEFAULT_CONFIG, vad=False, streaming=False, cache=False, warmup=False)
+    transcriber = Transcriber(config)
+    transcriber.load()
+    return DictationPipeline(config, ListSink(), Recorder(max_seconds=60), transcriber)
+
+
+def write_wav(path, seconds):
+    samples = (np.sin(np.arange(int(seconds * SAMPLE_RATE)) / 10) * 10000).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+
+def test_transcribes_a_file_without_any_ui(pipeline, tmp_path):
+    write_wav(tmp_path / "clip.wav", 2)
+    assert pipeline.transcribe_file(str(tmp_path / "clip.wav")) == f"{2 * SAMPLE_RATE} samples"
+
+
+def test_load_audio_reads_16k_wav_as_float(tmp_path):
+    write_wav(tmp_path / "clip.wav", 1)
+    audio = transcrybe_core.load_audio(str(tmp_path / "clip.wav"))
+    assert audio.dtype == np.float32 and len(audio) == SAMPLE_RATE
+    assert 0.2 < np.abs(audio).max() <= 1.0
+
+
+def test_changing_threads_reloads_the_engine(monkeypatch):
+    loads = []
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args: loads.append(args) or LengthEngine())
+    monkeypatch.setattr(transcrybe_core.WorkerClient, "connect", lambda *args, **kwargs: None)
+    transcriber = Transcriber(dict(DEFAULT_CONFIG, cache=False, warmup=False, threads=2))
+    transcriber.load()
+
+    assert not transcriber.load()
+    transcriber.config["threads"] = 4
+    assert transcriber.load()
+    assert [args[3] for args in loads] == [2, 4]
+
+
+def test_files_longer_than_the_recording_buffer_are_not_cut(pipeline, tmp_path):
+    write_wav(tmp_path / "long.wav", 90)  # The fixture's recorder holds 60s
+    pipeline.config["longform"] = False
+    assert pipeline.transcribe_file(str(tmp_path / "long.wav")) == f"{90 * SAMPLE_RATE} samples"
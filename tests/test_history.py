@@ -0,0 +1,52 @@
+from transcrybe_history import HistoryStore, fts_query, main
+
+
+def test_fts_query_matches_all_words_and_prefixes_the_last():
+    assert fts_query("quarterly rep") == '"quarterly" "rep"*'
+
+
+def test_fts_query_quotes_special_characters():
+    assert fts_query('say "hi" OR') == '"say" """hi""" "OR"*'
+    assert fts_query("   ") == ""
+
+
+def test_search_finds_newest_matches_first(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.add("the quarterly report is late", model="base")
+    store.add("lunch at noon")
+    store.add("quarterly numbers look good")
+    store.flush()
+
+    assert [entry["text"] for entry in store.search("quarterly")] == [
+        "quarterly numbers look good", "the quarterly report is late",
+    ]
+    assert [entry["text"] for entry in store.search("quarterly rep")] == ["the quarterly report is late"]
+    assert store.count() == 3
+
+
+def test_recent_lists_newest_first(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    for text in ("one", "two", "three"):
+        store.add(text)
+    store.flush()
+
+    assert [entry["text"] for entry in store.recent(2)] == ["three", "two"]
+
+
+def test_bare_file_name_is_created_in_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = HistoryStore("history.sqlite3")
+    store.add("hello")
+    store.flush()
+    assert (tmp_path / "history.sqlite3").exists()
+
+
+def test_blank_query_lists_the_latest(tmp_path, capsys):
+    path = str(tmp_path / "history.sqlite3")
+    store = HistoryStore(path)
+    store.add("hello there")
+    store.flush()
+
+    main(["  ", "--db", path])
+
+    assert "hello there" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+import transcrybe_core
+from transcrybe_core import DEFAULT_CONFIG, SAMPLE_RATE, Transcriber
+from transcrybe_engines import TranscriptionEngine
+
+AUDIO = np.full(SAMPLE_RATE, 0.1, dtype=np.float32)
+
+
+class ScriptedEngine(TranscriptionEngine):
+    """Returns queued results and records the options of every call"""
+
+    def __init__(self):
+        self.results = []
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        return self.results.pop(0)
+
+
+def detected(language, probability, logprob=-0.3):
+    return {"text": "hi", "language": language, "language_probability": probability,
+            "segments": [{"avg_logprob": logprob}]}
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    engine = ScriptedEngine()
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: engine)
+    monkeypatch.setattr(transcrybe_core.WorkerClient, "connect", lambda *args, **kwargs: None)
+
+    def make(**overrides):
+        config = dict(DEFAULT_CONFIG, vad=False, cache=False, warmup=False, **overrides)
+        transcriber = Transcriber(config)
+        transcriber.load()
+        return transcriber, engine
+    return make
+
+
+def test_confident_detection_is_reused(setup):
+    transcriber, engine = setup()
+    engine.results = [detected("de", 0.95), detected("de", None)]
+
+    transcriber.transcribe(AUDIO)
+    transcriber.transcribe(AUDIO)
+
+    assert "language" not in engine.calls[0]
+    assert engine.calls[1]["language"] == "de"
+
+
+def test_unsure_detection_is_not_reused(setup):
+    transcriber, engine = setup()
+    engine.results = [detected("nl", 0.5), detected("nl", 0.5)]
+
+    transcriber.transcribe(AUDIO)
+    transcriber.transcribe(AUDIO)
+
+    assert "language" not in engine.calls[1]
+    assert transcriber.language is None
+
+
+def test_poor_decode_with_a_reused_language_triggers_detection(setup):
+    transcriber, engine = setup()
+    engine.results = [detected("en", 0.99), detected("en", None, logprob=-1.5), detected("fr", 0.9)]
+
+    transcriber.transcribe(AUDIO)
+    transcriber.transcribe(AUDIO)
+    assert transcriber.language is None
+
+    transcriber.transcribe(AUDIO)
+    assert "language" not in engine.calls[2]
+    assert transcriber.language == "fr"
+
+
+def test_pinned_language_is_always_passed(setup):
+    transcriber, engine = setup(language="es")
+    engine.results = [detected("es", None), detected("es", None, logprob=-2.0)]
+
+    transcriber.transcribe(AUDIO)
+    transcriber.transcribe(AUDIO)
+
+    assert [call["language"] for call in engine.calls] == ["es", "es"]
+    assert transcriber.language is None
+
+
+def test_caching_can_be_turned_off(setup):
+    transcriber, engine = setup(cache_language=False)
+    engine.results = [detected("de", 0.99), detected("de", 0.99)]
+
+    transcriber.transcribe(AUDIO)
+    transcriber.transcribe(AUDIO)
+
+    assert "language" not in engine.calls[1]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from transcrybe_core import VoiceActivityDetector, split_at_silence
+
+RATE = 16000
+
+
+def speech_with_pauses(seconds, pauses, pause_seconds, seed=0):
+    """Noise at speech level with near-silent gaps starting at `pauses` (in seconds)"""
+    audio = (np.random.default_rng(seed).standard_normal(int(seconds * RATE)) * 0.1).astype(np.float32)
+    for at in pauses:
+        audio[int(at * RATE):int((at + pause_seconds) * RATE)] *= 1e-3
+    return audio
+
+
+@pytest.mark.parametrize("pause_seconds", [0.3, 0.5, 0.7])
+def test_cuts_inside_ordinary_sentence_pauses(pause_seconds):
+    pauses = [20, 40, 60, 80]
+    audio = speech_with_pauses(90, pauses, pause_seconds)
+
+    segments = split_at_silence(audio, VoiceActivityDetector(RATE), RATE)
+
+    assert not any(overlapped for _, _, overlapped in segments)
+    assert segments[0][0] == 0 and segments[-1][1] == len(audio)
+    for (_, stop, _), at in zip(segments, pauses):
+        assert at * RATE <= stop <= (at + pause_seconds) * RATE
+
+
+def test_segments_are_contiguous():
+    audio = speech_with_pauses(100, [12, 25, 31, 50, 77], 0.4)
+    segments = split_at_silence(audio, VoiceActivityDetector(RATE), RATE)
+
+    assert all(stop - start <= 28 * RATE for start, stop, _ in segments)
+    assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+
+
+def test_hard_cuts_with_overlap_when_there_is_no_pause():
+    audio = speech_with_pauses(60, [], 0)
+
+    segments = split_at_silence(audio, VoiceActivityDetector(RATE), RATE, max_seconds=28.0, overlap_seconds=1.0)
+
+    assert [(start, stop) for start, stop, _ in segments] == [
+        (0, 28 * RATE), (27 * RATE, 55 * RATE), (54 * RATE, len(audio)),
+    ]
+    assert [overlapped for _, _, overlapped in segments] == [False, True, True]
+
+
+def test_short_audio_is_a_single_segment():
+    audio = speech_with_pauses(10, [5], 0.5)
+    assert split_at_silence(audio, VoiceActivityDetector(RATE), RATE) == [(0, len(audio), False)]
@@ -0,0 +1,96 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from transcrybe_metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles_over_recent_values():
+    histogram = Histogram(window=100)
+    for value in range(1, 101):
+        histogram.observe(value / 100)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.51)
+    assert histogram.quantile(0.95) == pytest.approx(0.96)
+    assert Histogram().quantile(0.5) is None
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.03, 0.04, 2.0):
+        metrics.observe("decode", seconds)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert "# TYPE transcrybe_stage_seconds histogram" in lines
+    assert 'transcrybe_stage_seconds_bucket{stage="decode",le="0.025"} 0' in lines
+    assert 'transcrybe_stage_seconds_bucket{stage="decode",le="0.05"} 2' in lines
+    assert 'transcrybe_stage_seconds_bucket{stage="decode",le="2.5"} 3' in lines
+    assert 'transcrybe_stage_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'transcrybe_stage_seconds_count{stage="decode"} 3' in lines
+    total = next(line for line in lines if line.startswith('transcrybe_stage_seconds_sum{stage="decode"}'))
+    assert float(total.split()[-1]) == pytest.approx(2.07)
+
+
+def test_summary_reports_count_and_quantiles():
+    metrics = Metrics()
+    with metrics.span("paste"):
+        pass
+    summary = metrics.summary()
+    assert summary["paste"]["count"] == 1
+    assert summary["paste"]["p50"] >= 0
+
+
+def test_request_trace_is_appended_as_jsonl(tmp_path):
+    metrics = Metrics()
+    metrics.jsonl_path = str(tmp_path / "metrics.jsonl")
+
+    trace = metrics.begin()
+    with metrics.tracing(trace):
+        metrics.observe("decode", 0.25)
+        metrics.observe("decode", 0.5)
+    metrics.observe("decode", 1.0)  # Outside the request
+    metrics.end(trace, model="base")
+
+    with open(metrics.jsonl_path) as f:
+        record = json.loads(f.read())
+    assert record["model"] == "base"
+    assert record["spans"] == {"decode": 0.75}
+
+
+def test_traces_are_scoped_to_their_thread():
+    metrics = Metrics()
+    first, second = metrics.begin(), metrics.begin()
+
+    def record(trace, seconds):
+        with metrics.tracing(trace):
+            metrics.observe("decode", seconds)
+
+    threads = [threading.Thread(target=record, args=args) for args in ((first, 0.1), (second, 0.2))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert first.spans == {"decode": 0.1}
+    assert second.spans == {"decode": 0.2}
+    assert metrics.summary()["decode"]["count"] == 2
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    metrics = Metrics()
+    metrics.observe("decode", 0.1)
+    server = metrics.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.status == 200
+            assert b'stage="decode"' in response.read()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+    finally:
+        server.shutdown()
+        server.server_close()
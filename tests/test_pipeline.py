@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import transcrybe_core
+from transcrybe_core import DEFAULT_CONFIG, SAMPLE_RATE, DictationPipeline, OutputSink, Recorder, Transcriber
+from transcrybe_engines import TranscriptionEngine
+from transcrybe_metrics import METRICS
+
+DECODE_SECONDS = 0.1
+
+
+class StubEngine(TranscriptionEngine):
+    """Names each clip by its constant sample value, after a fixed decode time"""
+
+    def transcribe(self, audio, **options):
+        time.sleep(DECODE_SECONDS)
+        return {"text": f"clip {round(float(audio[0]) * 100)}", "segments": []}
+
+
+class ClipStream:
+    """Input stream that delivers one prerecorded clip as soon as it starts"""
+
+    clips = []
+
+    def __init__(self, callback, **_):
+        self.callback = callback
+
+    def start(self):
+        clip = self.clips.pop(0)
+        status = SimpleNamespace(input_overflow=False, input_underflow=False)
+        self.callback(clip[:, None], len(clip), None, status)
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ListSink(OutputSink):
+    def __init__(self):
+        self.texts = []
+
+    def write(self, text):
+        self.texts.append(text)
+        return True
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: StubEngine())
+    monkeypatch.setattr(METRICS, "jsonl_path", str(tmp_path / "metrics.jsonl"))
+    config = dict(
+        DEFAULT_CONFIG, cache=False, warmup=False, vad=False, streaming=False,
+        longform=False, short_utterance_seconds=0, memory_pressure_model=None,
+    )
+    recorder = Recorder(max_seconds=5, stream_factory=ClipStream)
+    transcriber = Transcriber(config)
+    transcriber.load(use_worker=False)
+    return DictationPipeline(config, ListSink(), recorder, transcriber)
+
+
+def dictate(pipeline, n):
+    ClipStream.clips.append(np.full(SAMPLE_RATE, n / 100, dtype=np.float32))
+    pipeline.start()
+    pipeline.stop()
+    return pipeline.submit()
+
+
+def test_submitted_jobs_are_delivered_in_order(pipeline):
+    finished = []
+    all_done = threading.Event()
+
+    def on_done(job):
+        finished.append(job)
+        if len(finished) == 3:
+            all_done.set()
+
+    pipeline.on_done = on_done
+    jobs = [dictate(pipeline, n) for n in (1, 2, 3)]
+    assert pipeline.pending == 3  # Recording could restart while earlier jobs were queued
+    assert all_done.wait(5)
+
+    assert pipeline.sink.texts == ["clip 1", "clip 2", "clip 3"]
+    assert [job.id for job in finished] == [job.id for job in jobs]
+    assert all(job.delivered and job.error is None for job in finished)
+    assert pipeline.pending == 0
+
+
+def test_each_job_keeps_its_own_trace(pipeline):
+    all_done = threading.Event()
+    pipeline.on_done = lambda job: job.id == 3 and all_done.set()
+    for n in (1, 2, 3):
+        dictate(pipeline, n)
+    assert all_done.wait(5)
+
+    with open(METRICS.jsonl_path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 3
+    for record in records:
+        # One decode per record, even though later jobs waited behind earlier ones
+        assert record["spans"]["decode"] < 1.5 * DECODE_SECONDS
+        assert record["spans"]["stop_to_output"] == pytest.approx(record["latency"], abs=1e-3)
+    assert records[2]["queue_wait"] > records[0]["queue_wait"]
+
+
+def test_empty_job_buffer_is_not_swapped_for_the_live_one():
+    recorder = Recorder(max_seconds=1)
+    recorder.load(np.ones(100, dtype=np.float32))
+    empty = recorder.detach()  # Takes the recording, leaves a fresh buffer
+    recorder.load(np.ones(50, dtype=np.float32))
+    empty.clear()
+
+    assert len(recorder.audio(empty)) == 0
+    assert len(recorder.audio()) == 50
+
+
+def test_model_is_not_unloaded_while_jobs_are_queued(pipeline, monkeypatch):
+    loads = []
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: loads.append(args) or StubEngine())
+    pipeline.config["idle_unload_minutes"] = 1e-6
+    all_done = threading.Event()
+    pipeline.on_done = lambda job: job.id == 3 and all_done.set()
+
+    for n in (1, 2, 3):
+        dictate(pipeline, n)
+    pipeline.watch_idle(interval=0.01)
+    assert all_done.wait(5)
+
+    assert pipeline.sink.texts == ["clip 1", "clip 2", "clip 3"]
+    assert loads == []
+    time.sleep(0.1)
+    assert pipeline.transcriber.engine is None  # Unloaded once the queue drained
+
+
+def test_job_reloads_a_model_unloaded_while_it_was_queued(pipeline):
+    done = threading.Event()
+    pipeline.on_done = lambda job: done.set()
+    pipeline.transcriber.unload()
+
+    # Queued without start(), which would have begun reloading already
+    pipeline.recorder.load(np.full(SAMPLE_RATE, 0.07, dtype=np.float32))
+    pipeline.submit()
+
+    assert done.wait(5)
+    assert pipeline.sink.texts == ["clip 7"]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from transcrybe_core import Resampler
+
+RATE = 16000
+
+
+@pytest.mark.parametrize("from_rate", [8000, 22050, 44100, 48000])
+def test_resampler_chunked_matches_whole(from_rate):
+    audio = np.random.default_rng(1).standard_normal(from_rate).astype(np.float32)
+
+    whole = Resampler(from_rate)
+    expected = np.concatenate([whole.process(audio), whole.flush()])
+
+    chunked = Resampler(from_rate)
+    sizes = np.random.default_rng(2).integers(1, 2000, size=len(audio))
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    parts = [chunked.process(audio[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if a < len(audio)]
+    actual = np.concatenate(parts + [chunked.flush()])
+
+    assert len(expected) == -(-len(audio) * RATE // from_rate)
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_resampler_preserves_an_in_band_tone():
+    rate = 48000
+    t = np.arange(rate) / rate
+    resampler = Resampler(rate)
+    output = np.concatenate([resampler.process(np.sin(2 * np.pi * 440 * t)), resampler.flush()])
+
+    reference = np.sin(2 * np.pi * 440 * np.arange(len(output)) / RATE)
+    middle = slice(RATE // 10, -RATE // 10)  # Ignore the filter's edge effects
+    np.testing.assert_allclose(output[middle], reference[middle], atol=1e-2)
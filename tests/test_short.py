@@ -0,0 +1,106 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import transcrybe_core
+from transcrybe_core import DEFAULT_CONFIG, SAMPLE_RATE, Transcriber
+from transcrybe_engines import FULL_AUDIO_CTX, TranscriptionEngine, WhisperEngine, short_audio_ctx
+
+
+class OptionsEngine(TranscriptionEngine):
+    """Records the options of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        return {"text": "ok", "segments": [], "language": "en"}
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    engine = OptionsEngine()
+    monkeypatch.setattr(transcrybe_core, "load_engine", lambda *args, **kwargs: engine)
+    monkeypatch.setattr(transcrybe_core.WorkerClient, "connect", lambda *args, **kwargs: None)
+
+    def make(seconds):
+        config = dict(DEFAULT_CONFIG, vad=False, cache=False, warmup=False, short_utterance_seconds=seconds)
+        transcriber = Transcriber(config)
+        transcriber.load()
+        return transcriber, engine
+    return make
+
+
+def clip(seconds):
+    return np.full(int(seconds * SAMPLE_RATE), 0.1, dtype=np.float32)
+
+
+def test_only_clips_under_the_threshold_take_the_short_path(setup):
+    transcriber, engine = setup(10)
+
+    transcriber.transcribe(clip(3))
+    transcriber.transcribe(clip(12))
+
+    assert engine.calls[0].get("short_context") is True
+    assert "short_context" not in engine.calls[1]
+
+
+def test_zero_threshold_turns_the_short_path_off(setup):
+    transcriber, engine = setup(0)
+    transcriber.transcribe(clip(1))
+    assert "short_context" not in engine.calls[0]
+
+
+def test_short_audio_ctx_covers_the_clip_plus_a_second():
+    assert short_audio_ctx(3 * SAMPLE_RATE) == 150 + 50
+    assert short_audio_ctx(SAMPLE_RATE + 1) == 51 + 50
+    assert short_audio_ctx(40 * SAMPLE_RATE) == FULL_AUDIO_CTX
+
+
+@pytest.fixture
+def short_engine(monkeypatch):
+    """WhisperEngine whose decoder returns queued results, one per temperature tried"""
+    decodes = []
+    temperatures = []
+
+    def decode(model, mel, options):
+        temperatures.append(options["temperature"])
+        return decodes.pop(0)
+
+    monkeypatch.setitem(sys.modules, "whisper", SimpleNamespace(DecodingOptions=lambda **kw: kw, decode=decode))
+    engine = WhisperEngine.__new__(WhisperEngine)
+    engine.model = SimpleNamespace(device=SimpleNamespace(type="cpu"))
+    engine._mel = lambda audio, audio_ctx: None
+
+    def run(*results):
+        decodes.extend(SimpleNamespace(**result) for result in results)
+        output = engine._transcribe_short(clip(2), language="en", temperature=(0.0, 0.2, 0.4))
+        return output, temperatures
+    return run
+
+
+def decoded(text, no_speech_prob=0.1, avg_logprob=-0.3, compression_ratio=1.2):
+    return dict(text=text, no_speech_prob=no_speech_prob, avg_logprob=avg_logprob, compression_ratio=compression_ratio)
+
+
+def test_silence_returns_no_text_without_trying_higher_temperatures(short_engine):
+    result, temperatures = short_engine(decoded("Thank you.", no_speech_prob=0.9, avg_logprob=-1.2))
+    assert result["text"] == "" and result["segments"] == []
+    assert temperatures == [0.0]
+
+
+def test_confident_speech_is_kept_despite_a_high_no_speech_probability(short_engine):
+    result, temperatures = short_engine(decoded("yes", no_speech_prob=0.9, avg_logprob=-0.5))
+    assert result["text"] == "yes"
+    assert temperatures == [0.0]
+
+
+def test_poor_decodes_fall_back_to_higher_temperatures(short_engine):
+    result, temperatures = short_engine(
+        decoded("la la la la", compression_ratio=3.0), decoded("mumble", avg_logprob=-1.4), decoded("hello"),
+    )
+    assert result["text"] == "hello"
+    assert temperatures == [0.0, 0.2, 0.4]
@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+
+from transcrybe_core import AudioBuffer, StreamingTranscriber, merge_overlap
+
+RATE = 16000
+
+
+class WindowRecorder:
+    """Fake transcribe callable that names each window and remembers what it got"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, audio, prompt):
+        self.calls.append((len(audio) / RATE, prompt))
+        return f"w{len(self.calls)}"
+
+
+def filled_buffer(seconds):
+    buffer = AudioBuffer(60 * RATE)
+    buffer.write(np.zeros(int(seconds * RATE), dtype=np.float32))
+    return buffer
+
+
+def test_merge_overlap_drops_repeated_words():
+    assert merge_overlap("the quick brown fox", "Brown fox jumps over") == "the quick brown fox jumps over"
+
+
+def test_merge_overlap_without_repetition_concatenates():
+    assert merge_overlap("hello there", "general kenobi") == "hello there general kenobi"
+    assert merge_overlap("", "first window") == "first window"
+
+
+def test_streams_windows_then_decodes_only_the_tail_on_finish():
+    transcribe = WindowRecorder()
+    streamer = StreamingTranscriber(transcribe, filled_buffer(20), RATE, window_seconds=8, overlap_seconds=1)
+    streamer.start()
+    deadline = time.time() + 5
+    while len(transcribe.calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert streamer.finish() == "w1 w2 w3"
+    # Each window after the first is prefixed with the overlap and prompted with the text so far
+    assert transcribe.calls == [(8.0, None), (9.0, "w1"), (5.0, "w1 w2")]
+    assert not streamer.failed
+
+
+def test_finish_without_new_audio_decodes_nothing():
+    transcribe = WindowRecorder()
+    streamer = StreamingTranscriber(transcribe, filled_buffer(0), RATE)
+    streamer.start()
+    assert streamer.finish() == ""
+    assert transcribe.calls == []
+
+
+def test_failed_window_is_reported():
+    def broken(audio, prompt):
+        raise RuntimeError("model fell over")
+
+    streamer = StreamingTranscriber(broken, filled_buffer(3), RATE)
+    assert streamer.finish() == ""
+    assert streamer.failed
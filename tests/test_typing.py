@@ -0,0 +1,90 @@
+import pytest
+
+import transcrybe_core
+from transcrybe_core import IncrementalOutput, TypingSink
+
+
+class RecordingSink(TypingSink):
+    """TypingSink that records key posts and clipboard fallbacks instead of sending them"""
+
+    def __init__(self, fail=False):
+        self.posts = []
+        self.clipboard = []
+        self.fail = fail
+
+    def _post(self, erase, insert):
+        if self.fail:
+            raise RuntimeError("no event tap")
+        self.posts.append((erase, insert))
+
+    def _fallback(self, text):
+        self.clipboard.append(text)
+
+
+@pytest.fixture
+def confirmed(monkeypatch):
+    """Whether the focused element is seen to change after typing"""
+    state = {"value": True}
+    monkeypatch.setattr(transcrybe_core, "_focused_text", lambda: "before")
+    monkeypatch.setattr(transcrybe_core, "_wait_for_change", lambda before, timeout=1.0: state["value"])
+    return state
+
+
+def test_corrections_only_retype_the_changed_tail(confirmed):
+    sink = RecordingSink()
+    assert sink.update("hello wrld", "hello world.")
+    assert sink.posts == [(3, "orld.")]
+
+
+def test_nothing_is_posted_when_text_is_unchanged(confirmed):
+    sink = RecordingSink()
+    assert sink.update("same", "same")
+    assert sink.posts == []
+
+
+def test_text_is_split_into_events_of_at_most_20_utf16_units():
+    sink = RecordingSink()
+    assert [len(chunk) for chunk in sink._chunks("x" * 45)] == [20, 20, 5]
+    # Emoji take two UTF-16 units each and must never be split
+    assert list(sink._chunks("😀" * 11)) == ["😀" * 10, "😀"]
+
+
+def test_unconfirmed_partials_are_not_retyped_or_copied(confirmed):
+    confirmed["value"] = False
+    sink = RecordingSink()
+    output = IncrementalOutput(sink)
+
+    assert not output.update("hello")
+    assert not output.update("hello world")
+
+    assert sink.posts == [(0, "hello"), (0, " world")]
+    assert output.typed == "hello world"
+    assert sink.clipboard == []
+
+
+def test_unconfirmed_final_text_is_left_on_the_clipboard(confirmed):
+    confirmed["value"] = False
+    sink = RecordingSink()
+    output = IncrementalOutput(sink)
+    output.update("hello")
+
+    assert not output.update("hello world", final=True)
+    assert sink.clipboard == ["hello world"]
+
+
+def test_failed_partial_keeps_typed_text_unchanged(confirmed):
+    sink = RecordingSink(fail=True)
+    output = IncrementalOutput(sink)
+
+    assert not output.update("hello")
+    assert output.typed == ""
+    assert sink.clipboard == []
+
+    assert not output.update("hello there", final=True)
+    assert sink.clipboard == ["hello there"]
+
+
+def test_write_reports_failure_instead_of_raising(confirmed):
+    sink = RecordingSink(fail=True)
+    assert sink.write("text") is False
+    assert sink.clipboard == ["text"]
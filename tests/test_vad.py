@@ -0,0 +1,33 @@
+import numpy as np
+
+from transcrybe_core import VoiceActivityDetector
+
+RATE = 16000
+
+
+def noise(seconds, level, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * RATE)) * level).astype(np.float32)
+
+
+def test_trims_leading_and_trailing_silence():
+    vad = VoiceActivityDetector(RATE)
+
+    kept = vad.trim(np.concatenate([noise(1, 1e-4), noise(1, 0.1), noise(1, 1e-4, seed=1)]))
+
+    # The speech plus a little padding on either side
+    assert 1.0 <= len(kept) / RATE <= 1.8
+    assert vad.stats["removed_seconds"] > 1.0
+
+
+def test_keeps_continuous_speech():
+    vad = VoiceActivityDetector(RATE)
+    speech = noise(3, 0.1)
+    assert len(vad.trim(speech)) >= len(speech) - vad.frame
+    assert vad.stats["removed_ratio"] < 0.01
+
+
+def test_short_blips_are_not_speech():
+    audio = noise(2, 1e-4)
+    audio[RATE:RATE + 480] = 0.5  # One 30 ms click
+    vad = VoiceActivityDetector(RATE)
+    assert not vad.speech_mask(audio).any()
@@ -0,0 +1,64 @@
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from transcrybe_worker import WorkerClient, WorkerServer, recv_message, send_message
+
+
+class EchoModel:
+    """Reports what it was asked to transcribe"""
+
+    def transcribe(self, audio, **options):
+        return {"text": f"{len(audio)} samples", "options": options, "peak": np.float32(audio.max())}
+
+
+def test_framing_round_trips_header_and_payload():
+    left, right = socket.socketpair()
+    with left, right:
+        payload = np.arange(300_000, dtype=np.float32).tobytes()  # Larger than one recv()
+        sender = threading.Thread(target=send_message, args=(left, {"op": "x", "n": np.int64(3)}, payload))
+        sender.start()
+        header, received = recv_message(right)
+        sender.join()
+
+    assert header == {"op": "x", "n": 3, "payload": len(payload)}
+    assert received == payload
+
+
+def test_closed_connection_raises_connection_error():
+    left, right = socket.socketpair()
+    with right:
+        left.sendall(b"\x00\x00")  # Half a length prefix
+        left.close()
+        with pytest.raises(ConnectionError):
+            recv_message(right)
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = WorkerServer(str(tmp_path / "worker.sock"))
+    server.get_model = lambda *args, **kwargs: (EchoModel(), threading.Lock())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_transcribes_through_the_worker(server):
+    client = WorkerClient.connect("base", path=server.path)
+
+    result = client.transcribe(np.full(1600, 0.5, dtype=np.float64), language="en")
+
+    assert result == {"text": "1600 samples", "options": {"language": "en"}, "peak": 0.5}
+
+
+def test_connect_without_a_worker_returns_none(tmp_path):
+    assert WorkerClient.connect("base", path=str(tmp_path / "missing.sock")) is None
+
+
+def test_worker_errors_are_raised_in_the_client(server):
+    client = WorkerClient.connect("base", path=server.path)
+    with pytest.raises(RuntimeError, match="Unknown op"):
+        client._request({"op": "bogus"})
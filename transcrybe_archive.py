@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Optional archive of dictation audio alongside the transcript history
+
+When `archive_audio` is on, the audio behind each history entry is
+compressed by a background thread (Opus or FLAC through ffmpeg) and kept
+under a size cap, oldest recordings going first. The history entry stores
+the file name, so a poor transcript can be re-run later with a bigger
+model:
+
+    transcrybe archive retranscribe --model medium
+"""
+
+import argparse
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+ARCHIVE_DIR = os.path.expanduser("~/Library/Application Support/Transcrybe/audio")
+
+# ffmpeg arguments per format; Opus at 24 kbit/s is ~180 KB per minute of speech
+FORMATS = {
+    "opus": ("opus", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"]),
+    "flac": ("flac", ["-c:a", "flac", "-sample_fmt", "s16"]),
+}
+
+# Apps launched from Finder don't inherit the shell's PATH
+FFMPEG_PATHS = ("/opt/homebrew/bin/ffmpeg", "/usr/local/bin/ffmpeg")
+
+
+def find_ffmpeg():
+    """Path to ffmpeg, or None"""
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    return next((path for path in FFMPEG_PATHS if os.path.exists(path)), None)
+
+
+class AudioArchive:
+    """Size-capped directory of compressed recordings, encoded in the background"""
+
+    def __init__(self, directory=ARCHIVE_DIR, format="opus", max_bytes=1024 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ffmpeg = find_ffmpeg()
+        if not self.ffmpeg:
+            logging.warning("ffmpeg not found, archiving audio as uncompressed WAV")
+            format = "wav"
+        elif format not in FORMATS:
+            logging.warning(f"Unknown archive format {format!r}, using opus")
+            format = "opus"
+        self.format = format
+        self._files = None  # name -> size in bytes, oldest first
+        self._bytes = 0
+        self._queue = queue.Queue()
+        self._encoder = threading.Thread(target=self._encode_loop, daemon=True)
+        self._encoder.start()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def add(self, audio, rate):
+        """Queue audio for encoding and return the file name it will have
+
+        The samples are copied, so the caller may reuse its buffer at once.
+        """
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.{FORMATS.get(self.format, ('wav',))[0]}"
+        self._queue.put((name, np.asarray(audio, dtype=np.float32).tobytes(), rate))
+        return name
+
+    def flush(self):
+        """Block until every queued recording has been written"""
+        self._queue.join()
+
+    def _encode_loop(self):
+        while True:
+            name, samples, rate = self._queue.get()
+            try:
+                start = time.perf_counter()
+                self._write(name, samples, rate)
+                size = os.path.getsize(self.path(name))
+                seconds = len(samples) / 4 / rate
+                logging.info(
+                    f"Archived {seconds:.1f}s of audio as {name} "
+                    f"({size / 1024:.0f} KB in {time.perf_counter() - start:.2f}s)"
+                )
+                self._account(name, size)
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.error(f"Failed to archive {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, samples, rate):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        temp = f"{path}.part.{name.rsplit('.', 1)[1]}"
+        if self.format == "wav":
+            pcm = (np.clip(np.frombuffer(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype(np.int16)
+            with wave.open(temp, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(rate)
+                f.writeframes(pcm.tobytes())
+        else:
+            _, codec = FORMATS[self.format]
+            # Niced to stay out of the way of decoding; preexec_fn isn't safe in this threaded process
+            subprocess.run(
+                ["nice", "-n", "10", self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-threads", "1",
+                 "-f", "f32le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0", *codec, temp],
+                input=samples, check=True, capture_output=True,
+            )
+        os.replace(temp, path)
+
+    def _load_index(self):
+        """Scan the archive directory once, oldest files first"""
+        if self._files is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if ".part." not in name:
+                    stat = os.stat(self.path(name))
+                    entries.append((stat.st_mtime, name, stat.st_size))
+        self._files = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._bytes = sum(self._files.values())
+
+    def _account(self, name, size):
+        self._load_index()
+        self._bytes += size - self._files.pop(name, 0)
+        self._files[name] = size
+        self._evict()
+
+    def _evict(self):
+        """Delete the oldest recordings until under max_bytes"""
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.unlink(self.path(name))
+            except OSError:
+                pass
+            logging.info(f"Archive over {self.max_bytes >> 20} MB, removed {name}")
+
+    def usage(self):
+        """Return (number of files, total bytes)"""
+        self._load_index()
+        return len(self._files), self._bytes
+
+
+def retranscribe(store, archive, config, workers, limit=None, dry_run=False):
+    """Decode archived audio again and replace the stored transcripts
+
+    Returns (entries updated, entries whose audio has been evicted).
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    from transcrybe_batch import _init_worker, _transcribe_file
+
+    entries = store.with_audio(limit)
+    present = {archive.path(entry["audio"]): entry for entry in entries if os.path.exists(archive.path(entry["audio"]))}
+    missing = len(entries) - len(present)
+    logging.info(f"{len(present)} archived recordings to re-transcribe, {missing} no longer on disk")
+    if not present:
+        return 0, missing
+
+    updated = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(config,)) as pool:
+        futures = {pool.submit(_transcribe_file, path): path for path in present}
+        for n, future in enumerate(as_completed(futures), 1):
+            entry = present[futures[future]]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"[{n}/{len(present)}] {entry['audio']} failed: {e}")
+                continue
+            if not result["text"] or result["text"] == entry["text"]:
+                continue
+            print(f"#{entry['id']}\n  - {entry['text']}\n  + {result['text']}")
+            if not dry_run:
+                store.update(
+                    entry["id"], text=result["text"], engine=config["engine"],
+                    model=config["model"], language=result["language"],
+                )
+            updated += 1
+    return updated, missing
+
+def main(argv=None):
+    """Inspect the audio archive or re-transcribe it with another model"""
+    from transcrybe_core import load_config
+    from transcrybe_history import HISTORY_PATH, HistoryStore
+
+    parser = argparse.ArgumentParser(prog="transcrybe archive", description="Manage archived dictation audio")
+    parser.add_argument("--db", default=HISTORY_PATH, help="History database")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="Archive directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show how much audio is archived")
+    redo = commands.add_parser("retranscribe", help="Re-run archived audio through another model")
+    redo.add_argument("--model", required=True, help="Model to decode with")
+    redo.add_argument("--engine", help="Override the configured engine")
+    redo.add_argument("-n", "--limit", type=int, help="Only the newest N entries")
+    redo.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                      help="Worker processes, each with its own model")
+    redo.add_argument("--dry-run", action="store_true", help="Show changes without saving them")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    if not os.path.exists(args.db):
+        sys.exit(f"No history at {args.db}")
+    store = HistoryStore(args.db)
+    archive = AudioArchive(args.dir)
+
+    if args.command == "stats":
+        files, size = archive.usage()
+        print(f"{files} recordings, {size / (1 << 20):.1f} MB in {args.dir}")
+        print(f"{len(store.with_audio())} history entries with audio")
+        return
+
+    config = load_config()
+    config["model"] = args.model
+    if args.engine:
+        config["engine"] = args.engine
+    # Recordings are independent, so detect each one's language afresh
+    config["cache_language"] = False
+    config["streaming"] = False
+    # The history records config["model"], so never swap in a smaller one
+    config["memory_pressure_model"] = None
+    # Split the cores between workers instead of oversubscribing them
+    config["threads"] = max(1, (os.cpu_count() or 2) // args.workers)
+    start = time.perf_counter()
+    updated, missing = retranscribe(store, archive, config, args.workers, args.limit, args.dry_run)
+    logging.info(
+        f"{'Would update' if args.dry_run else 'Updated'} {updated} transcripts with "
+        f"{config['engine']} {config['model']} in {time.perf_counter() - start:.1f}s"
+        + (f", {missing} recordings already evicted" if missing else "")
+    )
+
+if __name__ == "__main__":
+    main()
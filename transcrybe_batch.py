@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Batch transcription of recorded files across a pool of worker processes
+
+Each worker process loads its own copy of the configured model once and
+then takes files from the pool. Results are written as TXT, SRT and/or a
+combined JSONL file. A manifest of finished files makes runs resumable:
+files whose size and modification time match a manifest entry are
+skipped.
+
+    transcrybe batch ~/VoiceMemos --workers 4 --format txt srt
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from transcrybe_core import SAMPLE_RATE, Transcriber, find_audio_files, load_audio, load_config
+
+FORMATS = ("txt", "srt", "jsonl")
+
+_transcriber = None  # One per worker process
+
+
+def _init_worker(config):
+    """Load the model once per worker process"""
+    global _transcriber
+    logging.basicConfig(level=logging.WARNING)
+    _transcriber = Transcriber(config)
+    # Each worker holds its own model rather than funnelling into a shared worker socket
+    _transcriber.load(use_worker=False)
+
+def _transcribe_file(path):
+    """Transcribe one file inside a worker process"""
+    start = time.perf_counter()
+    audio = load_audio(path)
+    result = _transcriber.transcribe_result(audio)
+    return {
+        "path": path,
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "seconds": time.perf_counter() - start,
+        "text": result["text"].strip(),
+        "language": result.get("language"),
+        "segments": [
+            {"start": segment["start"], "end": segment["end"], "text": segment["text"].strip()}
+            for segment in result.get("segments", [])
+        ],
+    }
+
+def _srt_timestamp(seconds):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+def format_srt(segments):
+    """Render segments as SubRip subtitles"""
+    blocks = [
+        f"{n}\n{_srt_timestamp(segment['start'])} --> {_srt_timestamp(segment['end'])}\n{segment['text']}\n"
+        for n, segment in enumerate(segments, 1)
+    ]
+    return "\n".join(blocks)
+
+def _output_names(paths):
+    """Map each input file to an output stem that keeps directory structure"""
+    names = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for file in find_audio_files([path]):
+                names[file] = os.path.splitext(os.path.relpath(file, path))[0]
+        else:
+            names[path] = os.path.splitext(os.path.basename(path))[0]
+    return _disambiguate(names)
+
+def _disambiguate(names):
+    """Give inputs that would write the same outputs distinct stems
+    
+    Colliding inputs first get their parent directory prepended, and any
+    still colliding after that get a numeric suffix.
+    """
+    stems = {}
+    for path, stem in names.items():
+        stems.setdefault(stem, []).append(path)
+    for stem, paths in stems.items():
+        if len(paths) > 1:
+            for path in paths:
+                parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+                names[path] = os.path.join(parent, stem)
+    
+    seen = {}
+    for path in sorted(names):
+        stem = names[path]
+        count = seen.get(stem, 0) + 1
+        seen[stem] = count
+        if count > 1:
+            names[path] = f"{stem}-{count}"
+            logging.warning(f"{path} would overwrite another file's output, writing it as {names[path]}")
+    return names
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+def load_manifest(path):
+    """Return {input path: manifest entry} for files already done"""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    done[entry["path"]] = entry
+    return done
+
+def write_outputs(result, stem, output_dir, formats):
+    """Write one result in the requested formats, returning the files written"""
+    written = []
+    base = os.path.join(output_dir, stem)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    if "txt" in formats:
+        with open(base + ".txt", "w") as f:
+            f.write(result["text"] + "\n")
+        written.append(base + ".txt")
+    if "srt" in formats:
+        with open(base + ".srt", "w") as f:
+            f.write(format_srt(result["segments"]))
+        written.append(base + ".srt")
+    if "jsonl" in formats:
+        jsonl_path = os.path.join(output_dir, "results.jsonl")
+        with open(jsonl_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        written.append(jsonl_path)
+    return written
+
+def main(argv=None):
+    """Transcribe files and directories with a process pool"""
+    parser = argparse.ArgumentParser(prog="transcrybe batch", description="Batch-transcribe audio files")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories")
+    parser.add_argument("-o", "--output-dir", default="transcripts", help="Where to write results")
+    parser.add_argument("-f", "--format", nargs="+", choices=FORMATS, default=["txt"], help="Output formats")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes, each with its own model")
+    parser.add_argument("--manifest", help="Manifest for resuming (default: OUTPUT_DIR/manifest.jsonl)")
+    parser.add_argument("--engine", help="Override the configured engine")
+    parser.add_argument("--model", help="Override the configured model")
+    parser.add_argument("--language", help="Language code of all files, instead of detecting it per file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    config = load_config()
+    if args.engine:
+        config["engine"] = args.engine
+    if args.model:
+        config["model"] = args.model
+    if args.language:
+        config["language"] = args.language
+    # Files may be in different languages, so don't carry a detection over to the next one
+    config["cache_language"] = False
+    # Timestamps must line up with the source files, so no silence trimming,
+    # and the short-utterance path only returns a single segment
+    config["vad"] = False
+    config["short_utterance_seconds"] = 0
+    config["streaming"] = False
+    # Transcripts must come from the model asked for, however tight memory is
+    config["memory_pressure_model"] = None
+    # Split the cores between workers instead of oversubscribing them
+    config["threads"] = max(1, (os.cpu_count() or 2) // args.workers)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.jsonl")
+    done = load_manifest(manifest_path)
+
+    names = _output_names(args.paths)
+    pending = [
+        path for path in names
+        if not (path in done and all(done[path].get(k) == v for k, v in _file_identity(path).items()))
+    ]
+    logging.info(f"{len(names)} files, {len(names) - len(pending)} already done, {len(pending)} to transcribe")
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    failures = 0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(config,)) as pool, \
+            open(manifest_path, "a") as manifest:
+        futures = {pool.submit(_transcribe_file, path): path for path in pending}
+        for n, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                logging.error(f"[{n}/{len(pending)}] {path} failed: {e}")
+                continue
+
+            outputs = write_outputs(result, names[path], args.output_dir, args.format)
+            entry = {"path": path, **_file_identity(path), "audio_seconds": result["audio_seconds"], "outputs": outputs}
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+            audio_seconds += result["audio_seconds"]
+            logging.info(f"[{n}/{len(pending)}] {path}: {result['audio_seconds']:.0f}s audio in {result['seconds']:.1f}s")
+
+    wall = time.perf_counter() - start
+    logging.info(
+        f"Transcribed {audio_seconds / 3600:.2f} audio-hours in {wall / 3600:.3f} hours with "
+        f"{args.workers} workers: {audio_seconds / wall:.1f} audio-hours per wall-clock hour"
+        + (f", {failures} failed" if failures else "")
+    )
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
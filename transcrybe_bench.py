@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+End-to-end dictation latency benchmark
+
+Replays a corpus of audio files through the real capture → preprocess →
+transcribe → output pipeline, using a fake input device that feeds the
+capture callback at (a multiple of) real time. For every file and model
+size it reports time to first text, stop-to-text latency, real-time
+factor and wall/CPU time per stage; each model runs in its own
+subprocess so peak RSS is per model. Results are written as JSON for CI.
+
+    transcrybe-bench corpus/ --model tiny base small --output bench.json
+
+`transcrybe-bench resample` instead measures the capture stage alone at
+common device rates: callback CPU time and how accurately the resampler
+reproduces in-band tones and rejects out-of-band ones.
+
+    transcrybe-bench resample --rates 16000 44100 48000 --channels 1 2
+
+`transcrybe-bench short` compares the short-utterance path with full
+30-second windows on the same clips: latency, and word error rate
+against a reference transcript in a `.txt` file next to each clip (or
+against the full-window output when there is none).
+
+    transcrybe-bench short corpus/ --model tiny base
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+from transcrybe_core import (
+    SAMPLE_RATE,
+    AudioBuffer,
+    CaptureEngine,
+    DictationPipeline,
+    OutputSink,
+    Recorder,
+    Transcriber,
+    find_audio_files,
+    load_audio,
+    load_config,
+)
+
+
+class FakeInputStream:
+    """Stand-in for sounddevice.InputStream that replays a buffer"""
+
+    def __init__(self, audio, speed=1.0, samplerate=SAMPLE_RATE, channels=1,
+                 blocksize=0, callback=None, **_):
+        self.audio = audio
+        self.speed = speed  # 0 = as fast as possible
+        self.rate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize or 512
+        self.callback = callback
+        self.cpu_time = 0.0
+        self.done = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        pass
+
+    def _run(self):
+        """Deliver blocks on the same schedule a real device would"""
+        status = SimpleNamespace(input_overflow=False, input_underflow=False)
+        start = time.perf_counter()
+        for offset in range(0, len(self.audio), self.blocksize):
+            if not self._running:
+                break
+            block = self.audio[offset:offset + self.blocksize]
+            indata = np.repeat(block[:, None], self.channels, axis=1)
+
+            cpu = time.thread_time()
+            self.callback(indata, len(block), None, status)
+            self.cpu_time += time.thread_time() - cpu
+
+            if self.speed:
+                due = start + (offset + len(block)) / self.rate / self.speed
+                time.sleep(max(0.0, due - time.perf_counter()))
+        self.done.set()
+
+
+class StageTimer:
+    """Accumulate wall and CPU time for named stages"""
+
+    def __init__(self):
+        self.stages = defaultdict(lambda: {"wall": 0.0, "cpu": 0.0, "calls": 0})
+
+    def add(self, name, wall, cpu):
+        stage = self.stages[name]
+        stage["wall"] += wall
+        stage["cpu"] += cpu
+        stage["calls"] += 1
+
+    def wrap(self, name, fn, clock=time.thread_time):
+        """Return `fn` instrumented to record into stage `name`
+
+        CPU time is the calling thread's by default; pass
+        time.process_time for work spread over a thread pool.
+        """
+        def timed(*args, **kwargs):
+            wall = time.perf_counter()
+            cpu = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - wall, clock() - cpu)
+        return timed
+
+
+class CollectSink(OutputSink):
+    """Keep transcripts in memory instead of pasting them"""
+
+    def __init__(self):
+        self.texts = []
+
+    def write(self, text):
+        self.texts.append(text)
+        return True
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def bench_file(path, transcriber, config, speed):
+    """Replay one file through the pipeline and measure it"""
+    audio = load_audio(path)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, speed, **kwargs))
+        return streams[-1]
+
+    timer = StageTimer()
+    transcriber.trim_silence = timer.wrap("preprocess", Transcriber.trim_silence.__get__(transcriber))
+    engine = transcriber.engine
+    # Inference runs on the engine's own threads, so count CPU time for the whole process
+    engine.transcribe = timer.wrap("transcribe", type(engine).transcribe.__get__(engine), time.process_time)
+
+    sink = CollectSink()
+    recorder = Recorder(max_seconds=int(audio_seconds) + 1, stream_factory=stream_factory)
+    pipeline = DictationPipeline(config, sink, recorder, transcriber)
+
+    start = time.perf_counter()
+    pipeline.start()
+    first_text = None
+    while not streams[0].done.wait(0.01):
+        if first_text is None and pipeline.streamer and pipeline.streamer.text:
+            first_text = time.perf_counter() - start
+    pipeline.stop()
+    stopped = time.perf_counter()
+    timer.add("capture", stopped - start, streams[0].cpu_time)
+
+    text = pipeline.finish()
+    output = timer.wrap("output", sink.write)
+    output(text)
+    done = time.perf_counter()
+
+    latency = done - stopped
+    return {
+        "file": path,
+        "audio_seconds": round(audio_seconds, 3),
+        "time_to_first_text": round(first_text if first_text is not None else done - start, 4),
+        "latency": round(latency, 4),
+        "rtf": round(timer.stages["transcribe"]["wall"] / audio_seconds, 4) if audio_seconds else None,
+        "stages": {
+            name: {key: round(value, 4) for key, value in stage.items()}
+            for name, stage in timer.stages.items()
+        },
+        "text": text,
+    }
+
+def run_model(args):
+    """Benchmark every file with one model in this process"""
+    config = load_config()
+    config["model"] = args.model[0]
+    if args.engine:
+        config["engine"] = args.engine
+    config["streaming"] = not args.no_stream
+    config["vad"] = not args.no_vad
+    # Cached results would skip the model entirely from the second run on
+    config["cache"] = False
+    # Long files would otherwise go to the long-form worker pool, not the engine being timed
+    config["longform"] = False
+    # Measure the model asked for, even under memory pressure
+    config["memory_pressure_model"] = None
+
+    transcriber = Transcriber(config)
+    load_start = time.perf_counter()
+    # In-process, so a running transcrybe-worker can't stand in for the model being measured
+    transcriber.load(use_worker=False)
+    load_seconds = time.perf_counter() - load_start
+
+    results = [bench_file(path, transcriber, config, args.speed) for path in find_audio_files(args.paths)]
+    latencies = sorted(result["latency"] for result in results)
+    audio_seconds = sum(result["audio_seconds"] for result in results)
+    transcribe_seconds = sum(result["stages"].get("transcribe", {}).get("wall", 0) for result in results)
+    return {
+        "engine": config["engine"],
+        "model": config["model"],
+        "streaming": config["streaming"],
+        "vad": config["vad"],
+        "speed": args.speed,
+        "load_seconds": round(load_seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "summary": {
+            "files": len(results),
+            "audio_seconds": round(audio_seconds, 3),
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_max": latencies[-1] if latencies else None,
+            "rtf": round(transcribe_seconds / audio_seconds, 4) if audio_seconds else None,
+        },
+        "results": results,
+    }
+
+TEST_TONES = ((440, 0.3), (3000, 0.2), (6500, 0.1))  # In band: must survive
+ALIAS_TONE = 11000  # Above 8 kHz: must be filtered out, or it folds back to 5 kHz
+
+def _tones(tones, rate, seconds):
+    t = np.arange(int(rate * seconds)) / rate
+    return sum(amplitude * np.sin(2 * np.pi * frequency * t) for frequency, amplitude in tones)
+
+def _snr_db(reference, actual):
+    n = min(len(reference), len(actual))
+    edge = SAMPLE_RATE // 20  # Skip filter start-up at both ends
+    reference, actual = reference[edge:n - edge], actual[edge:n - edge]
+    return 10 * np.log10(np.sum(reference ** 2) / max(np.sum((actual - reference) ** 2), 1e-20))
+
+def _capture(signal, rate, channels, blocksize):
+    """Push a signal through CaptureEngine as a device at `rate`, timing the callback"""
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(signal, 0, **kwargs))
+        return streams[-1]
+
+    buffer = AudioBuffer(len(signal) * SAMPLE_RATE // rate + SAMPLE_RATE)
+    capture = CaptureEngine(buffer, SAMPLE_RATE, channels, blocksize, stream_factory, device_rate=rate)
+    capture.start()
+    streams[0].done.wait()
+    capture.stop()
+    return buffer.view().copy(), streams[0].cpu_time
+
+def bench_resampler(rate, channels, seconds=10.0, blocksize=512):
+    """Capture-stage CPU and accuracy for one device format"""
+    signal = _tones(TEST_TONES, rate, seconds).astype(np.float32)
+    output, cpu = _capture(signal, rate, channels, blocksize)
+    reference = _tones(TEST_TONES, SAMPLE_RATE, seconds)
+
+    # Naive per-signal linear interpolation, for comparison
+    t_out = np.arange(len(reference)) / SAMPLE_RATE
+    linear = np.interp(t_out, np.arange(len(signal)) / rate, signal)
+
+    result = {
+        "rate": rate,
+        "channels": channels,
+        "cpu_ms_per_audio_second": round(cpu / seconds * 1000, 4),
+        "snr_db": round(float(_snr_db(reference, output)), 1),
+        "linear_snr_db": round(float(_snr_db(reference, linear)), 1),
+    }
+    if rate > SAMPLE_RATE:
+        # Energy left from a tone that can't be represented at 16 kHz
+        alias = _tones(((ALIAS_TONE, 0.5),), rate, seconds).astype(np.float32)
+        leaked, _ = _capture(alias, rate, channels, blocksize)
+        linear = np.interp(t_out, np.arange(len(alias)) / rate, alias)
+        edge = SAMPLE_RATE // 20
+        result["alias_db"] = round(20 * float(np.log10(np.std(leaked[edge:-edge]) / np.std(alias))), 1)
+        result["linear_alias_db"] = round(20 * float(np.log10(np.std(linear[edge:-edge]) / np.std(alias))), 1)
+    return result
+
+def _words(text):
+    return [word.lower().strip(".,!?;:\"'") for word in text.split() if word.strip(".,!?;:\"'")]
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance between two transcripts"""
+    reference, hypothesis = _words(reference), _words(hypothesis)
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(reference)
+
+def _reference_text(path):
+    """Transcript stored next to an audio file as NAME.txt, if any"""
+    reference = os.path.splitext(path)[0] + ".txt"
+    if os.path.exists(reference):
+        with open(reference) as f:
+            return f.read().strip()
+    return None
+
+def bench_short(model, args):
+    """Decode each clip with and without the short-utterance path"""
+    config = load_config()
+    config.update(model=model, cache=False, streaming=False, vad=not args.no_vad, memory_pressure_model=None)
+    if args.engine:
+        config["engine"] = args.engine
+    transcriber = Transcriber(config)
+    transcriber.load(use_worker=False)
+
+    files = []
+    errors = {"full": [0, 0], "short": [0, 0], "short_vs_full": [0, 0]}
+    for path in find_audio_files(args.paths):
+        audio = load_audio(path)
+        if len(audio) >= args.max_seconds * SAMPLE_RATE:
+            continue
+        texts, latencies = {}, {}
+        for mode, threshold in (("full", 0), ("short", args.max_seconds + 1)):
+            config["short_utterance_seconds"] = threshold
+            start = time.perf_counter()
+            texts[mode] = transcriber.transcribe(audio)
+            latencies[mode] = time.perf_counter() - start
+
+        reference = _reference_text(path)
+        result = {"file": path, "audio_seconds": round(len(audio) / SAMPLE_RATE, 3)}
+        for mode in ("full", "short"):
+            result[f"latency_{mode}"] = round(latencies[mode], 4)
+            result[f"text_{mode}"] = texts[mode]
+        pairs = [("short_vs_full", texts["full"], texts["short"])]
+        if reference is not None:
+            pairs += [("full", reference, texts["full"]), ("short", reference, texts["short"])]
+        for name, expected, actual in pairs:
+            edits, words = word_errors(expected, actual)
+            errors[name][0] += edits
+            errors[name][1] += words
+            result[f"wer_{name}"] = round(edits / words, 4) if words else None
+        files.append(result)
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2] if values else None
+
+    full = median([result["latency_full"] for result in files])
+    short = median([result["latency_short"] for result in files])
+    return {
+        "engine": config["engine"],
+        "model": model,
+        "summary": {
+            "files": len(files),
+            "latency_full_p50": full,
+            "latency_short_p50": short,
+            "speedup": round(full / short, 2) if full and short else None,
+            **{
+                f"wer_{name}": round(edits / words, 4) if words else None
+                for name, (edits, words) in errors.items()
+            },
+        },
+        "results": files,
+    }
+
+def short_main(argv):
+    """Benchmark the short-utterance path against full 30-second windows"""
+    parser = argparse.ArgumentParser(prog="transcrybe-bench short",
+                                     description="Short-utterance path latency and accuracy")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories, with optional NAME.txt references")
+    parser.add_argument("--model", nargs="+", default=["tiny", "base"], help="Model sizes to compare")
+    parser.add_argument("--engine", help="Override the configured engine")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Only use clips shorter than this")
+    parser.add_argument("--no-vad", action="store_true", help="Do not trim silence")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler(sys.stderr)])
+
+    runs = []
+    for model in args.model:
+        run = bench_short(model, args)
+        runs.append(run)
+        summary = run["summary"]
+        print(
+            f"{run['engine']}/{model}: {summary['files']} clips, p50 latency {summary['latency_full_p50']}s full "
+            f"vs {summary['latency_short_p50']}s short ({summary['speedup']}x), "
+            f"WER {summary['wer_full']} full vs {summary['wer_short']} short, "
+            f"{summary['wer_short_vs_full']} short vs full",
+            file=sys.stderr,
+        )
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "short": runs}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+def resample_main(argv):
+    """Benchmark capture at device-native formats against 16 kHz mono"""
+    parser = argparse.ArgumentParser(prog="transcrybe-bench resample",
+                                     description="Capture resampling benchmark")
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100, 48000],
+                        help="Device sample rates to simulate (16000 is the direct path)")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2], help="Device channel counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of the test signal")
+    parser.add_argument("--blocksize", type=int, default=512, help="Frames per callback")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rate in args.rates:
+        for channels in args.channels:
+            result = bench_resampler(rate, channels, args.seconds, args.blocksize)
+            results.append(result)
+            print(
+                f"{rate} Hz x{channels}: {result['cpu_ms_per_audio_second']} ms CPU per audio second, "
+                f"SNR {result['snr_db']} dB (linear {result['linear_snr_db']} dB)"
+                + (f", alias {result['alias_db']} dB (linear {result['linear_alias_db']} dB)"
+                   if "alias_db" in result else ""),
+                file=sys.stderr,
+            )
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "resample": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+def main(argv=None):
+    """Run the benchmark, one subprocess per model size"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["resample"]:
+        resample_main(argv[1:])
+        return
+    if argv[:1] == ["short"]:
+        short_main(argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(description="Transcrybe latency benchmark")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories to replay")
+    parser.add_argument("--model", nargs="+", default=["tiny", "base"], help="Model sizes to benchmark")
+    parser.add_argument("--engine", help="Override the configured engine")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to real time, 0 = as fast as possible")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streaming while recording")
+    parser.add_argument("--no-vad", action="store_true", help="Do not trim silence")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    if args.single:
+        json.dump(run_model(args), sys.stdout)
+        return
+
+    # Fresh process per model so peak RSS and warm caches don't leak between runs
+    runs = []
+    for model in args.model:
+        command = [sys.executable, os.path.abspath(__file__), *args.paths, "--single",
+                   "--model", model, "--speed", str(args.speed)]
+        if args.engine:
+            command += ["--engine", args.engine]
+        if args.no_stream:
+            command.append("--no-stream")
+        if args.no_vad:
+            command.append("--no-vad")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode:
+            sys.stderr.write(completed.stderr)
+            sys.exit(f"Benchmark for model '{model}' failed")
+        run = json.loads(completed.stdout)
+        runs.append(run)
+        summary = run["summary"]
+        print(
+            f"{run['engine']}/{model}: {summary['files']} files, "
+            f"p50 latency {summary['latency_p50']}s, max {summary['latency_max']}s, "
+            f"RTF {summary['rtf']}, peak RSS {run['peak_rss_mb']} MB",
+            file=sys.stderr,
+        )
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": runs}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+if __name__ == "__main__":
+    main()
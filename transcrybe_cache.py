@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of transcription results
+
+Results are keyed by a hash of the float32 PCM buffer together with the
+engine, model and decode options, so identical audio decoded the same
+way never reaches the model twice. A small in-memory LRU sits in front
+of an on-disk LRU with a size cap.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.expanduser("~/Library/Caches/Transcrybe/transcripts")
+
+
+def _json_default(value):
+    """Serialize numpy scalars that sneak into engine results"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class TranscriptCache:
+    """Two-tier LRU cache of engine results"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=256 << 20, memory_entries=128):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._disk = None  # key -> size in bytes, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        # Scanning a full cache means tens of thousands of stats; keep that off the first lookup
+        threading.Thread(target=self._build_index, daemon=True).start()
+
+    @staticmethod
+    def key(audio, engine_key, options):
+        """Hash audio samples together with everything that affects the result"""
+        digest = hashlib.sha256(audio.tobytes())
+        context = {"engine": list(engine_key), "options": options}
+        digest.update(json.dumps(context, sort_keys=True, default=_json_default).encode("utf-8"))
+        return digest.hexdigest()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _build_index(self):
+        with self._lock:
+            self._load_index()
+
+    def _load_index(self):
+        """Scan the cache directory once, oldest entries first"""
+        if self._disk is not None:
+            return
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_bytes = sum(self._disk.values())
+
+    def get(self, key):
+        """Return a cached result or None"""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            else:
+                result = self._get_disk(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        logging.info(
+            f"Transcript cache {'hit' if result is not None else 'miss'} "
+            f"({self.hit_rate:.0%} hit rate over {self.hits + self.misses} lookups)"
+        )
+        return result
+
+    def _get_disk(self, key):
+        self._load_index()
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)  # Record the access for LRU across restarts
+        except (OSError, ValueError) as e:
+            logging.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key, result):
+        """Store a result in both tiers, evicting old entries past the size cap"""
+        result = {name: value for name, value in result.items() if name != "timings"}
+        encoded = json.dumps(result, default=_json_default).encode("utf-8")
+        with self._lock:
+            self._remember(key, result)
+            self._load_index()
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(encoded)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                logging.warning(f"Failed to write cache entry {path}: {e}")
+                return
+            self._disk_bytes += len(encoded) - self._disk.pop(key, 0)
+            self._disk[key] = len(encoded)
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used files until under max_bytes"""
+        while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
@@ -0,0 +1,1482 @@
+#!/usr/bin/env python3
+"""
+Headless transcription core: recorder, transcriber and output sinks
+
+Nothing in here imports a UI toolkit, so the whole hot path can be run,
+profiled and load-tested on machines without a menu bar. The macOS app
+in `menubar_transcriber.py` is a thin shell over `DictationPipeline`.
+"""
+
+import argparse
+import contextvars
+import gc
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+from transcrybe_cache import TranscriptCache
+from transcrybe_engines import load_engine
+from transcrybe_metrics import METRICS
+from transcrybe_worker import WorkerClient
+
+SAMPLE_RATE = 16000  # What Whisper expects
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".m4a", ".ogg", ".opus", ".aiff")
+
+CONFIG_PATH = os.path.expanduser("~/Library/Application Support/Transcrybe/config.json")
+MODEL_SIZES = ["tiny", "base", "small", "medium"]
+LANGUAGES = {  # Menu choices; any Whisper language code works in the config file
+    "Auto-detect": None,
+    "English": "en",
+    "Spanish": "es",
+    "French": "fr",
+    "German": "de",
+    "Japanese": "ja",
+    "Chinese": "zh",
+}
+DEFAULT_CONFIG = {
+    "engine": "whisper",    # One of transcrybe_engines.ENGINES
+    "model": "base",        # One of MODEL_SIZES
+    "fp16": False,          # Compute dtype for the whisper engine; fp16 only helps on GPU
+    "compute_type": None,   # Compute type for other engines, e.g. "int8"
+    "threads": 0,           # CPU threads, 0 = engine default
+    "short_utterance_seconds": 0,  # Encode clips shorter than this without 30s padding, 0 = off
+    "beam_size": None,      # None = greedy decoding
+    "language": None,       # Pinned language code, None = detect
+    "cache_language": True,  # Reuse a confident detection instead of detecting every time
+    "language_confidence": 0.8,  # Detection probability needed to reuse it
+    "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],  # Fallback schedule
+    "native_capture": True,  # Open the mic at its own rate and resample here
+    "streaming": True,
+    "vad": True,
+    "warmup": True,         # Dummy pass after loading and after idle periods
+    "warmup_idle_seconds": 300,
+    "idle_unload_minutes": 30,  # Free the model after this long unused, 0 = never
+    "memory_pressure_model": "tiny",  # Smaller model to load under memory pressure, None = off
+    "longform": True,       # Decode long recordings as parallel segments
+    "longform_threshold_seconds": 60,
+    "longform_workers": 0,  # Worker processes, 0 = half the CPU cores
+    "cache": True,          # Reuse results for audio that was already transcribed
+    "cache_max_mb": 256,    # On-disk cache size cap
+    "metrics_jsonl": True,  # Append per-request stage timings to the log directory
+    "history": True,        # Keep a searchable history of transcripts
+    "archive_audio": False,  # Also keep compressed audio of each history entry
+    "archive_format": "opus",  # "opus" or "flac"
+    "archive_max_mb": 1024,  # Oldest recordings are deleted past this size
+    "output": "type",       # "type" key events, or "paste" via the clipboard
+    "restore_clipboard": True,  # Put the old clipboard back after pasting
+    "metrics_port": 0,      # Serve Prometheus /metrics on this local port, 0 = off
+}
+
+# kern.memorystatus_vm_pressure_level values
+PRESSURE_NORMAL, PRESSURE_WARN, PRESSURE_CRITICAL = 1, 2, 4
+
+_libc = None
+
+def memory_pressure():
+    """Return the macOS memory pressure level, or 0 where it is unavailable
+    
+    Read with sysctlbyname in-process: it is checked on every hotkey press,
+    and forking a process that holds a loaded model is slow.
+    """
+    global _libc
+    import ctypes
+    import ctypes.util
+    
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        level = ctypes.c_int(0)
+        size = ctypes.c_size_t(ctypes.sizeof(level))
+        if _libc.sysctlbyname(b"kern.memorystatus_vm_pressure_level", ctypes.byref(level), ctypes.byref(size), None, 0):
+            return 0
+        return level.value
+    except (OSError, AttributeError):  # Not macOS
+        return 0
+
+def load_config():
+    """Load user settings, filling in defaults for anything missing"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(CONFIG_PATH) as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable config {CONFIG_PATH}: {e}")
+    return config
+
+def save_config(config):
+    """Write user settings to disk"""
+    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
+    with open(CONFIG_PATH, "w") as f:
+        json.dump(config, f, indent=2)
+
+def decode_options(config):
+    """Build Whisper transcribe() keyword arguments from settings"""
+    options = {
+        "fp16": config["fp16"],
+        "temperature": tuple(config["temperature"]),
+    }
+    if config["beam_size"]:
+        options["beam_size"] = config["beam_size"]
+    return options
+
+def _normalize_word(word):
+    """Normalize a word for overlap comparison"""
+    return word.lower().strip(".,!?;:\"'")
+
+def merge_overlap(previous, current, max_words=12):
+    """Join two transcripts, dropping words repeated across a window overlap"""
+    previous_words = previous.split()
+    current_words = current.split()
+    limit = min(max_words, len(previous_words), len(current_words))
+    
+    # Find the longest run of words that ends `previous` and starts `current`
+    for n in range(limit, 0, -1):
+        tail = [_normalize_word(w) for w in previous_words[-n:]]
+        head = [_normalize_word(w) for w in current_words[:n]]
+        if tail == head:
+            current_words = current_words[n:]
+            break
+    
+    return " ".join(previous_words + current_words)
+
+class AudioBuffer:
+    """Fixed-capacity ring buffer of mono float32 samples"""
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.written = 0  # Absolute number of samples written since clear()
+        self._data = np.zeros(capacity, dtype=np.float32)
+    
+    def __len__(self):
+        return min(self.written, self.capacity)
+    
+    @property
+    def start(self):
+        """Absolute position of the oldest sample still held"""
+        return max(0, self.written - self.capacity)
+    
+    @property
+    def dropped(self):
+        """Number of samples overwritten because the buffer was full"""
+        return self.start
+    
+    @property
+    def fill_ratio(self):
+        """How full the buffer is, from 0.0 to 1.0"""
+        return len(self) / self.capacity
+    
+    def clear(self):
+        """Forget all samples without releasing the storage"""
+        self.written = 0
+    
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones once full"""
+        samples = samples.reshape(-1)
+        if len(samples) > self.capacity:
+            self.written += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        
+        n = len(samples)
+        offset = self.written % self.capacity
+        first = min(n, self.capacity - offset)
+        self._data[offset:offset + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self.written += n
+    
+    def read(self, start=None, stop=None):
+        """Return samples [start, stop) by absolute position
+        
+        The result is a zero-copy view of the storage unless the range
+        wraps around the end of the ring.
+        """
+        start = self.start if start is None else max(start, self.start)
+        stop = self.written if stop is None else min(stop, self.written)
+        if stop <= start:
+            return self._data[:0]
+        
+        offset = start % self.capacity
+        end = offset + (stop - start)
+        if end <= self.capacity:
+            return self._data[offset:end]
+        return np.concatenate([self._data[offset:], self._data[:end - self.capacity]])
+    
+    def view(self):
+        """Return every sample currently held"""
+        return self.read()
+
+class Resampler:
+    """Incremental polyphase resampler with a windowed-sinc anti-aliasing filter
+    
+    Converts blocks of mono audio between any two integer rates as they
+    arrive, carrying filter history and phase across calls so the output
+    is identical to resampling the whole signal at once. Output is
+    aligned with the input (the filter delay is compensated); call
+    flush() at the end to emit the last few samples.
+    """
+    
+    def __init__(self, from_rate, to_rate=SAMPLE_RATE, zero_crossings=16, beta=8.0):
+        common = np.gcd(int(from_rate), int(to_rate))
+        self.up = int(to_rate) // common
+        self.down = int(from_rate) // common
+        # Filter spans `zero_crossings` cycles of the cutoff on each side
+        taps_per_phase = -(-2 * zero_crossings * max(self.up, self.down) // self.up)
+        self.taps = taps_per_phase
+        
+        # Low-pass at the lower Nyquist frequency, designed at the upsampled rate.
+        # An odd-length design keeps the delay a whole number of samples.
+        length = self.up * taps_per_phase
+        cutoff = 0.5 / max(self.up, self.down) * 0.95
+        n = np.arange(length - 1) - (length - 2) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length - 1, beta) * self.up
+        h = np.append(h, 0.0)
+        # Row p holds the taps for output phase p, reversed to line up with input windows
+        self._phases = h.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+        
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        # Upsampled position of the next output, relative to the start of the history
+        self._position = (taps_per_phase - 1) * self.up + (length - 2) // 2
+        self._consumed = 0
+        self._emitted = 0
+    
+    def process(self, samples):
+        """Resample one block, returning however many output samples are ready"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self._consumed += len(samples)
+        return self._process(samples)
+    
+    def _process(self, samples):
+        signal = np.concatenate([self._history, samples])
+        available = len(signal) * self.up  # Outputs need input index position // up < len(signal)
+        count = max(0, -(-(available - self._position) // self.down))
+        positions = self._position + self.down * np.arange(count)
+        
+        index = positions // self.up
+        windows = np.lib.stride_tricks.sliding_window_view(signal, self.taps)
+        output = np.einsum("nk,nk->n", self._phases[positions % self.up], windows[index - (self.taps - 1)])
+        
+        keep = self.taps - 1
+        self._position += count * self.down - (len(signal) - keep) * self.up
+        self._history = signal[len(signal) - keep:]
+        self._emitted += count
+        return output
+    
+    def flush(self):
+        """Emit the samples still held back by the filter delay"""
+        expected = -(-self._consumed * self.up // self.down)
+        output = self._process(np.zeros(self.taps // 2 + 1, dtype=np.float32))
+        return output[:max(0, len(output) - (self._emitted - expected))]
+
+class CaptureEngine:
+    """Callback-driven microphone capture into an AudioBuffer
+    
+    PortAudio calls `_callback` on its own thread for every block. The
+    callback is the buffer's only writer and publishes samples by bumping
+    `written` after the copy, so readers never need a lock.
+    
+    With `native` set, the default input device is opened at its own
+    sample rate and channel count (up to stereo), and blocks are downmixed
+    and resampled to `rate` as they arrive instead of by the host.
+    """
+    
+    def __init__(self, buffer, rate, channels=1, blocksize=0, stream_factory=None,
+                 native=False, device_rate=None):
+        self.buffer = buffer
+        self.rate = rate
+        self.channels = channels
+        self.blocksize = blocksize  # 0 lets the host pick its optimal block size
+        self.stream_factory = stream_factory  # Defaults to sounddevice.InputStream
+        self.native = native
+        self.device_rate = device_rate  # Capture rate when not queried from the device
+        self.overflows = 0
+        self.underflows = 0
+        self.resampler = None
+        self._stream = None
+    
+    def _device_format(self):
+        """Sample rate and channel count to open the input stream with"""
+        if self.native and self.stream_factory is None:
+            try:
+                import sounddevice as sd
+                info = sd.query_devices(kind="input")
+                return int(info["default_samplerate"]), max(1, min(2, info["max_input_channels"]))
+            except Exception as e:
+                logging.warning(f"Could not query the input device, capturing at {self.rate} Hz: {e}")
+        return self.device_rate or self.rate, self.channels
+    
+    def start(self):
+        """Open the input stream and start capturing"""
+        stream_factory = self.stream_factory
+        if stream_factory is None:
+            import sounddevice as sd
+            stream_factory = sd.InputStream
+        
+        rate, channels = self._device_format()
+        self.resampler = Resampler(rate, self.rate) if rate != self.rate else None
+        if self.resampler or channels > 1:
+            logging.info(f"Capturing {channels} channel(s) at {rate} Hz, converting to mono {self.rate} Hz")
+        
+        self.overflows = 0
+        self.underflows = 0
+        self._stream = stream_factory(
+            samplerate=rate,
+            channels=channels,
+            dtype=np.float32,
+            blocksize=self.blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+    
+    def stop(self):
+        """Stop capturing once the blocks already recorded have been delivered"""
+        stream, self._stream = self._stream, None
+        if not stream:
+            return
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as e:
+            logging.warning(f"Failed to close input stream: {e}")
+        if self.resampler:
+            self.buffer.write(self.resampler.flush())
+        if self.overflows or self.underflows:
+            logging.warning(f"Capture had {self.overflows} overflows and {self.underflows} underflows")
+    
+    def _callback(self, indata, frames, time_info, status):
+        """Copy one block from PortAudio into the buffer"""
+        if status.input_overflow:
+            self.overflows += 1
+        if status.input_underflow:
+            self.underflows += 1
+        if indata.shape[1] == 1 and not self.resampler:
+            self.buffer.write(indata[:, 0])
+            return
+        samples = indata.mean(axis=1) if indata.shape[1] > 1 else indata[:, 0]
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        self.buffer.write(samples)
+
+class StreamingTranscriber:
+    """Transcribe overlapping windows of audio while recording is still going"""
+    
+    def __init__(self, transcribe, buffer, rate, window_seconds=8.0, overlap_seconds=1.0, on_text=None):
+        self.transcribe = transcribe  # callable(audio, prompt) -> text
+        self.on_text = on_text  # callable(text), called with the running transcript after each window
+        self.buffer = buffer
+        self.rate = rate
+        self.window = int(window_seconds * rate)
+        self.overlap = int(overlap_seconds * rate)
+        self.text = ""
+        self.failed = False
+        
+        self._position = 0  # Absolute buffer position decoded so far
+        self._running = False
+        self._thread = None
+    
+    def start(self):
+        """Start the background window decoder"""
+        self._running = True
+        # Run in a copy of the caller's context so spans land in its request trace
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), daemon=True)
+        self._thread.start()
+    
+    def finish(self):
+        """Stop streaming and decode whatever is left after the last window"""
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        
+        stop = self.buffer.written
+        if stop > self._position:
+            self._decode(self._read(stop))
+        return self.text
+    
+    def _read(self, stop):
+        """Read from the decoded position to `stop`, prefixed by the overlap"""
+        if self._position < self.buffer.start:
+            logging.warning("Streaming decoder fell behind capture, audio was dropped")
+        with METRICS.span("buffer_read"):
+            audio = self.buffer.read(self._position - self.overlap, stop)
+        self._position = stop
+        return audio
+    
+    def _run(self):
+        """Decode windows as soon as enough audio has been captured"""
+        while self._running:
+            if self.buffer.written - self._position < self.window:
+                time.sleep(0.25)
+                continue
+            self._decode(self._read(self._position + self.window))
+    
+    def _decode(self, audio):
+        """Decode one window and merge it into the running transcript"""
+        try:
+            prompt = self.text[-200:] or None
+            text = self.transcribe(audio, prompt)
+            self.text = merge_overlap(self.text, text)
+            logging.info(f"Streaming partial ({len(audio) / self.rate:.1f}s window): {self.text[-50:]}")
+            if self.on_text:
+                self.on_text(self.text)
+        except Exception as e:
+            self.failed = True
+            logging.error(f"Streaming window failed: {e}")
+
+class VoiceActivityDetector:
+    """Energy-based voice activity detector that trims non-speech audio"""
+    
+    def __init__(self, rate, frame_ms=30, padding_ms=300, min_speech_ms=90,
+                 threshold_db=-50.0, max_threshold_db=-35.0, noise_margin_db=10.0):
+        self.frame = int(rate * frame_ms / 1000)
+        self.padding_frames = int(padding_ms / frame_ms)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.threshold_db = threshold_db  # Absolute floor for quiet rooms
+        self.max_threshold_db = max_threshold_db  # Cap so speech without pauses is never dropped
+        self.noise_margin_db = noise_margin_db  # Speech must beat the noise floor by this much
+        self.rate = rate
+        self.total_samples = 0
+        self.removed_samples = 0
+    
+    @property
+    def stats(self):
+        """Cumulative amount of audio seen and removed"""
+        total = self.total_samples / self.rate
+        removed = self.removed_samples / self.rate
+        return {
+            "total_seconds": total,
+            "removed_seconds": removed,
+            "removed_ratio": removed / total if total else 0.0,
+        }
+    
+    def speech_mask(self, audio, padded=True):
+        """Return a per-frame boolean mask of frames to keep
+        
+        With padded=False the mask covers only the detected speech, without
+        the padding that trimming keeps around it.
+        """
+        n_frames = len(audio) // self.frame
+        if n_frames == 0:
+            return np.ones(1, dtype=bool)
+        
+        frames = audio[:n_frames * self.frame].reshape(n_frames, self.frame)
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = np.clip(noise_floor + self.noise_margin_db, self.threshold_db, self.max_threshold_db)
+        speech = energy_db > threshold
+        
+        # Drop blips shorter than min_speech_frames, then pad around what remains
+        k = self.min_speech_frames
+        speech = np.convolve(speech, np.ones(k), mode="same") >= k
+        if not padded:
+            return speech
+        pad = k // 2 + self.padding_frames
+        return np.convolve(speech, np.ones(2 * pad + 1), mode="same") > 0
+    
+    def trim(self, audio):
+        """Return only the speech (plus padding) in `audio`"""
+        mask = self.speech_mask(audio)
+        samples = np.repeat(mask, self.frame)
+        if len(samples) < len(audio):
+            samples = np.concatenate([samples, np.full(len(audio) - len(samples), mask[-1])])
+        kept = audio[samples[:len(audio)]]
+        
+        self.total_samples += len(audio)
+        self.removed_samples += len(audio) - len(kept)
+        logging.info(
+            f"VAD kept {len(kept) / self.rate:.1f}s of {len(audio) / self.rate:.1f}s "
+            f"(removed {self.stats['removed_ratio']:.0%} of audio so far)"
+        )
+        return kept
+
+
+def split_at_silence(audio, vad, rate, max_seconds=28.0, min_seconds=5.0, overlap_seconds=1.0,
+                     min_pause_seconds=0.15):
+    """Split audio into independent segments, cutting inside pauses
+    
+    Returns (start, stop, overlapped) sample ranges in order. Cuts go in
+    the middle of pauses of at least min_pause_seconds. A segment is only
+    hard-cut when no pause falls within max_seconds; the next
+    one then starts overlap_seconds early and is flagged as overlapped
+    so its text can be de-duplicated when stitching.
+    """
+    max_len = int(max_seconds * rate)
+    min_len = int(min_seconds * rate)
+    overlap = int(overlap_seconds * rate)
+    
+    # Candidate cut points: the middle of every pause. The unpadded mask is
+    # used, as padding would swallow ordinary pauses between sentences.
+    quiet = np.flatnonzero(~vad.speech_mask(audio, padded=False))
+    pauses = np.split(quiet, np.flatnonzero(np.diff(quiet) != 1) + 1)
+    min_pause = max(1, int(min_pause_seconds * rate / vad.frame))
+    silent = np.array(
+        [(pause[0] + pause[-1] + 1) * vad.frame // 2 for pause in pauses if len(pause) >= min_pause],
+        dtype=np.int64,
+    )
+    
+    segments = []
+    start = 0
+    overlapped = False
+    while len(audio) - start > max_len:
+        limit = start + max_len
+        i = np.searchsorted(silent, limit, side="right") - 1
+        if i >= 0 and silent[i] >= start + min_len:
+            cut = int(silent[i])
+            segments.append((start, cut, overlapped))
+            start, overlapped = cut, False
+        else:
+            segments.append((start, limit, overlapped))
+            start, overlapped = limit - overlap, True
+    segments.append((start, len(audio), overlapped))
+    return segments
+
+_pool_transcriber = None  # One per ParallelDecoder worker process
+
+def _init_pool_worker(config):
+    """Load the model once per worker process"""
+    global _pool_transcriber
+    _pool_transcriber = Transcriber(config)
+    _pool_transcriber.load(use_worker=False)
+
+def _pool_transcribe(audio):
+    return _pool_transcriber.transcribe(audio)
+
+class ParallelDecoder:
+    """Decode the segments of one long recording across worker processes
+    
+    Each worker holds its own model, so the pool is started on first use
+    and kept warm for later long recordings.
+    """
+    
+    def __init__(self, config, workers=0):
+        self.workers = workers or max(2, (os.cpu_count() or 2) // 2)
+        # Split the cores between workers instead of oversubscribing them.
+        # Workers load once and stay up, so they don't follow memory pressure.
+        self.config = dict(
+            config, threads=max(1, (os.cpu_count() or 2) // self.workers), memory_pressure_model=None,
+        )
+        self._pool = None
+    
+    def transcribe(self, audio, vad, rate):
+        """Split at pauses, decode segments in parallel and stitch the text"""
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            logging.info(f"Starting {self.workers} long-form decoder processes")
+            self._pool = ProcessPoolExecutor(
+                self.workers, initializer=_init_pool_worker, initargs=(self.config,)
+            )
+        
+        segments = split_at_silence(audio, vad, rate)
+        logging.info(f"Long-form decode of {len(audio) / rate:.0f}s in {len(segments)} segments")
+        futures = [
+            self._pool.submit(_pool_transcribe, np.ascontiguousarray(audio[start:stop]))
+            for start, stop, _ in segments
+        ]
+        
+        text = ""
+        for (_, _, overlapped), future in zip(segments, futures):
+            part = future.result()
+            if overlapped:
+                text = merge_overlap(text, part)
+            else:
+                text = f"{text} {part}".strip()
+        return text
+    
+    def shutdown(self):
+        if self._pool:
+            # Segments already queued still finish; cancel_futures needs Python 3.9
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+def load_audio(path):
+    """Load an audio file as 16 kHz mono float32
+    
+    16 kHz PCM WAV files are read directly; anything else is decoded with
+    Whisper's ffmpeg helper.
+    """
+    try:
+        with wave.open(path, "rb") as f:
+            if f.getframerate() == SAMPLE_RATE and f.getsampwidth() == 2:
+                frames = f.readframes(f.getnframes())
+                audio = np.frombuffer(frames, dtype=np.int16).reshape(-1, f.getnchannels())
+                return audio.mean(axis=1).astype(np.float32) / 32768.0
+    except (wave.Error, EOFError):
+        pass
+    
+    from whisper.audio import load_audio as ffmpeg_load_audio
+    return ffmpeg_load_audio(path, sr=SAMPLE_RATE)
+
+def find_audio_files(paths):
+    """Expand files and directories into a sorted list of audio files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            files.append(path)
+    return sorted(files)
+
+class Recorder:
+    """Microphone capture into a preallocated ring buffer"""
+    
+    def __init__(self, rate=SAMPLE_RATE, channels=1, max_seconds=600, stream_factory=None,
+                 native=False, device_rate=None):
+        self.rate = rate
+        self.max_seconds = max_seconds
+        # Preallocated capture buffer, so memory stays flat however long we record
+        self.buffer = AudioBuffer(max_seconds * rate)
+        self.capture = CaptureEngine(self.buffer, rate, channels, stream_factory=stream_factory,
+                                     native=native, device_rate=device_rate)
+        self.is_recording = False
+        self._started = 0.0
+        self._spare = []  # Buffers handed back by finished jobs
+    
+    @property
+    def duration(self):
+        """Seconds captured since the last start()"""
+        return self.buffer.written / self.rate
+    
+    def start(self):
+        """Clear the buffer and start capturing"""
+        self.buffer.clear()
+        self.capture.start()
+        self.is_recording = True
+        self._started = time.perf_counter()
+    
+    def stop(self):
+        """Stop capturing"""
+        self.is_recording = False
+        self.capture.stop()
+        METRICS.observe("capture", time.perf_counter() - self._started)
+        logging.info(f"Captured {self.duration:.1f}s ({self.buffer.fill_ratio:.0%} of buffer)")
+    
+    def level(self, seconds=0.1):
+        """RMS level of the most recent audio in dBFS, for meters"""
+        samples = self.buffer.read(self.buffer.written - int(seconds * self.rate))
+        if not len(samples):
+            return -100.0
+        return 20 * float(np.log10(max(float(np.sqrt(np.mean(samples ** 2))), 1e-5)))
+    
+    def detach(self):
+        """Hand the captured buffer over and capture into a spare one from now on"""
+        buffer = self.buffer
+        self.buffer = self._spare.pop() if self._spare else AudioBuffer(buffer.capacity)
+        self.capture.buffer = self.buffer
+        return buffer
+    
+    def release(self, buffer):
+        """Take back a detached buffer for reuse once its job is done"""
+        buffer.clear()
+        self._spare.append(buffer)
+    
+    def load(self, audio):
+        """Replace the buffer contents with pre-recorded audio
+        
+        A file longer than the buffer gets a buffer sized to fit, so it
+        isn't cut to the last max_seconds like a live recording would be.
+        """
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if len(audio) > self.buffer.capacity:
+            self.buffer = AudioBuffer(len(audio))
+            self.capture.buffer = self.buffer
+        self.buffer.clear()
+        self.buffer.write(audio)
+    
+    def audio(self, buffer=None):
+        """Return everything captured as a zero-copy view where possible"""
+        if buffer is None:  # An empty job buffer is falsy but must not fall back
+            buffer = self.buffer
+        if buffer.dropped:
+            logging.warning(
+                f"Recording exceeded {self.max_seconds}s, "
+                f"dropped the first {buffer.dropped / self.rate:.1f}s"
+            )
+        with METRICS.span("buffer_read"):
+            return buffer.view()
+
+class Transcriber:
+    """Speech-to-text over a pluggable engine, with silence trimming"""
+    
+    # Mean segment log probability below which a reused language is detected again
+    REDETECT_LOGPROB = -1.0
+    
+    def __init__(self, config, rate=SAMPLE_RATE):
+        self.config = config
+        self.rate = rate
+        self.engine = None
+        self.engine_key = None
+        self.vad = VoiceActivityDetector(rate)
+        self.cache = None
+        if config["cache"]:
+            # Created up front so its disk index is scanned before the first dictation
+            self.cache = TranscriptCache(max_bytes=config["cache_max_mb"] << 20)
+        self.parallel = None
+        self.language = None  # Detected language reused across requests
+        self.last_used = 0.0
+        self._engine_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+    
+    @property
+    def ready(self):
+        return self.engine is not None
+    
+    def wait_ready(self, timeout=None):
+        """Block until an engine is loaded, returning False on timeout"""
+        with METRICS.span("model_wait"):
+            return self._ready.wait(timeout)
+    
+    def configured_key(self):
+        """Identify the engine/model/compute type/thread count the config asks for"""
+        return (self.config["engine"], self.config["model"], self.config["compute_type"], self.config["threads"])
+    
+    def target_key(self):
+        """The configured key, with the model shrunk while memory is tight"""
+        engine, name, compute_type, threads = self.configured_key()
+        fallback = self.config["memory_pressure_model"]
+        if (
+            fallback in MODEL_SIZES and name in MODEL_SIZES
+            and MODEL_SIZES.index(fallback) < MODEL_SIZES.index(name)
+            and memory_pressure() >= PRESSURE_WARN
+        ):
+            logging.info(f"Memory pressure is high, using the {fallback} model instead of {name}")
+            name = fallback
+        return (engine, name, compute_type, threads)
+    
+    def load(self, use_worker=True):
+        """Load the configured engine, returning False if it is already loaded
+        
+        When swapping models the old engine keeps serving requests until
+        the new one is ready.
+        """
+        with self._load_lock:
+            key = self.target_key()
+            engine, name, compute_type, threads = key
+            if self.engine and key == self.engine_key:
+                self._ready.set()
+                return False
+            
+            # Prefer a running worker process, which already has the model warm
+            with METRICS.span("model_load"):
+                client = WorkerClient.connect(name, engine, compute_type) if use_worker else None
+                if client:
+                    logging.info(f"Using transcription worker at {client.path}")
+                    self.engine = client
+                else:
+                    self.engine = load_engine(engine, name, compute_type, threads)
+                    logging.info(f"{engine} model '{name}' loaded successfully")
+            self.engine_key = key
+            self.last_used = time.monotonic()
+            if self.parallel:
+                # Long-form workers still hold the previous model
+                self.parallel.shutdown()
+                self.parallel = None
+            self._ready.set()
+        if self.config["warmup"]:
+            self.warmup()
+        return True
+    
+    def load_in_background(self):
+        """Load or swap to the target model on a thread
+        
+        Decoding waits for it, so audio can be captured in the meantime.
+        """
+        def run():
+            # Under the lock, so a load finishing concurrently can't have its set() undone
+            with self._load_lock:
+                if self.engine is None:
+                    self._ready.clear()  # After a failed load, make decoding wait again
+            try:
+                self.load()
+            except Exception as e:
+                logging.error(f"Failed to load model: {e}")
+                self._ready.set()  # Release waiters; decoding then reports the error
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+    
+    def unload(self, reason="idle"):
+        """Drop the engine so its memory can be returned to the system"""
+        with self._load_lock, self._engine_lock:
+            if self.engine is None:
+                return
+            logging.info(f"Unloading {self.engine_key[0]} model '{self.engine_key[1]}' ({reason})")
+            self._ready.clear()
+            self.engine = None
+            self.engine_key = None
+            if self.parallel:
+                self.parallel.shutdown()
+                self.parallel = None
+        gc.collect()
+    
+    def check_idle(self):
+        """Apply the idle and memory pressure policy to a loaded model"""
+        # A worker holds the model out of process, so there is nothing to free here
+        if self.engine is None or isinstance(self.engine, WorkerClient):
+            return
+        idle = time.monotonic() - self.last_used
+        timeout = self.config["idle_unload_minutes"] * 60
+        if timeout and idle > timeout:
+            self.unload(f"idle for {idle / 60:.0f} minutes")
+        elif self.engine_key != self.target_key():
+            # Free the big model now; the next dictation loads the smaller one
+            self.unload("memory pressure")
+    
+    def warmup(self):
+        """Run a dummy pass through the engine and log what it cost"""
+        with self._engine_lock:
+            start = time.perf_counter()
+            try:
+                with METRICS.span("warmup"):
+                    self.engine.warmup(**decode_options(self.config))
+            except Exception as e:
+                logging.warning(f"Model warm-up failed: {e}")
+                return
+            self.last_used = time.monotonic()
+        logging.info(f"Warmed up {self.engine_key[0]} model '{self.engine_key[1]}' in {time.perf_counter() - start:.2f}s")
+    
+    def warm_if_idle(self):
+        """Warm up in the background if the engine sat idle long enough to go cold"""
+        idle = time.monotonic() - self.last_used
+        if self.ready and self.config["warmup"] and idle > self.config["warmup_idle_seconds"]:
+            logging.info(f"Model idle for {idle:.0f}s, warming up")
+            threading.Thread(target=self.warmup, daemon=True).start()
+    
+    def trim_silence(self, audio):
+        """Drop non-speech audio before it reaches the model"""
+        if not self.config["vad"]:
+            return audio
+        with METRICS.span("preprocess"):
+            return self.vad.trim(audio)
+    
+    def transcribe(self, audio, prompt=None):
+        """Transcribe 16 kHz mono float32 audio held in memory"""
+        return self.transcribe_result(audio, prompt)["text"].strip()
+    
+    def transcribe_result(self, audio, prompt=None):
+        """Like transcribe(), but return the engine's full result dict"""
+        audio = self.trim_silence(audio)
+        if not len(audio):
+            return {"text": "", "segments": [], "language": None}
+        if not self._ready.is_set():
+            self.wait_ready()
+        if self.engine is None:
+            raise RuntimeError("No speech model loaded")
+        
+        # A known language skips the detection pass before decoding
+        options = decode_options(self.config)
+        language = self.config["language"] or self.language
+        if language:
+            options["language"] = language
+        if len(audio) < self.config["short_utterance_seconds"] * self.rate:
+            options["short_context"] = True
+        result = self._decode(audio, initial_prompt=prompt, **options)
+        if not self.config["language"]:
+            self._update_language(result, reused=language is not None)
+        return result
+    
+    def _update_language(self, result, reused):
+        """Remember a confident detection, or forget one that stopped fitting"""
+        if reused:
+            logprobs = [segment["avg_logprob"] for segment in result.get("segments", []) if "avg_logprob" in segment]
+            if logprobs and np.mean(logprobs) < self.REDETECT_LOGPROB:
+                logging.info(f"Low confidence decoding as '{self.language}', detecting the language again")
+                self.language = None
+            return
+        
+        probability = result.get("language_probability")
+        if not self.config["cache_language"] or probability is None:
+            return
+        if probability >= self.config["language_confidence"]:
+            self.language = result["language"]
+            logging.info(f"Detected language '{self.language}' ({probability:.0%}), reusing it from now on")
+        else:
+            logging.info(f"Detected language '{result['language']}' with only {probability:.0%} confidence")
+    
+    def _decode(self, audio, **options):
+        """Run the engine, going through the result cache when enabled"""
+        if self.config["cache"] and self.cache is None:
+            self.cache = TranscriptCache(max_bytes=self.config["cache_max_mb"] << 20)
+        cache = self.cache if self.config["cache"] else None
+        
+        if cache:
+            with METRICS.span("cache_lookup"):
+                # The thread count doesn't change the transcript
+                key = cache.key(audio, self.engine_key[:3], options)
+                result = cache.get(key)
+            if result is not None:
+                return result
+        
+        with self._engine_lock:
+            start = time.perf_counter()
+            result = self.engine.transcribe(audio, **options)
+            elapsed = time.perf_counter() - start
+            self.last_used = time.monotonic()
+        
+        # Engines that can tell encoder and decoder time apart report "timings"
+        timings = result.get("timings") or {"decode": elapsed}
+        for stage, seconds in timings.items():
+            METRICS.observe(stage, seconds)
+        
+        if cache:
+            cache.put(key, result)
+        return result
+    
+    def transcribe_long(self, audio):
+        """Transcribe a long recording as segments decoded in parallel"""
+        if self.parallel is None:
+            self.parallel = ParallelDecoder(self.config, self.config["longform_workers"])
+        with METRICS.span("longform_decode"):
+            return self.parallel.transcribe(audio, self.vad, self.rate)
+    
+    def stream(self, buffer, on_text=None):
+        """Start decoding `buffer` in overlapping windows while it fills"""
+        streamer = StreamingTranscriber(self.transcribe, buffer, self.rate, on_text=on_text)
+        streamer.start()
+        return streamer
+
+class OutputSink:
+    """Destination for finished transcripts
+    
+    Incremental sinks also implement update(typed, text, final), which
+    brings output already shown for a partial transcript in line with
+    `text`.
+    """
+    
+    incremental = False
+    
+    def write(self, text):
+        """Deliver text, returning True if it reached its destination"""
+        raise NotImplementedError
+
+class StdoutSink(OutputSink):
+    """Print transcripts, for the CLI and benchmarks"""
+    
+    def write(self, text):
+        print(text, flush=True)
+        return True
+
+def _focused_text():
+    """Value of the focused text element via Accessibility, or None if unreadable"""
+    try:
+        from ApplicationServices import AXUIElementCopyAttributeValue, AXUIElementCreateSystemWide
+        
+        error, element = AXUIElementCopyAttributeValue(AXUIElementCreateSystemWide(), "AXFocusedUIElement", None)
+        if error or element is None:
+            return None
+        error, value = AXUIElementCopyAttributeValue(element, "AXValue", None)
+        return value if not error and isinstance(value, str) else None
+    except Exception:
+        return None
+
+def _wait_for_change(before, timeout=1.0):
+    """Poll the focused element until its text changes
+    
+    Returns True once it does, False on timeout, or None when the element
+    can't be read (secure fields, some non-native apps).
+    """
+    if before is None:
+        return None
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if _focused_text() != before:
+            return True
+        time.sleep(0.01)
+    return False
+
+def _wait_for_modifiers_released(timeout=1.0):
+    """Wait until the hotkey's modifiers are let go, so they don't combine with our keys"""
+    try:
+        import Quartz
+    except ImportError:
+        return
+    mask = (Quartz.kCGEventFlagMaskCommand | Quartz.kCGEventFlagMaskShift
+            | Quartz.kCGEventFlagMaskAlternate | Quartz.kCGEventFlagMaskControl)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if not Quartz.CGEventSourceFlagsState(Quartz.kCGEventSourceStateHIDSystemState) & mask:
+            return
+        time.sleep(0.01)
+
+class TypingSink(OutputSink):
+    """Type text at the cursor as synthetic key events, leaving the clipboard alone (macOS)
+    
+    Partial transcripts can be typed while recording; later corrections
+    are applied with backspaces.
+    """
+    
+    incremental = True
+    DELETE_KEY = 51
+    MAX_EVENT_UNITS = 20  # macOS ignores characters past 20 UTF-16 units per event
+    
+    def write(self, text):
+        try:
+            return self.update("", text)
+        except Exception:
+            return False
+    
+    def update(self, typed, text, final=True):
+        """Turn `typed`, already on screen, into `text`
+        
+        Raises if the key events could not be posted. Otherwise returns
+        whether the focused element was seen to change. Only a final
+        transcript is also left on the clipboard when typing fails or
+        can't be confirmed, so partials never replace the user's clipboard.
+        """
+        common = len(os.path.commonprefix([typed, text]))
+        erase, insert = len(typed) - common, text[common:]
+        if not erase and not insert:
+            return True
+        
+        with METRICS.span("type"):
+            _wait_for_modifiers_released()
+            before = _focused_text()
+            try:
+                self._post(erase, insert)
+            except Exception as e:
+                logging.warning(f"Typing failed: {e}")
+                if final:
+                    self._fallback(text)
+                raise
+            confirmed = _wait_for_change(before) is not False
+            if not confirmed:
+                logging.warning("Typed text did not appear in the focused element")
+                if final:
+                    self._fallback(text)
+        return confirmed
+    
+    def _fallback(self, text):
+        """Leave the text on the clipboard for a manual paste"""
+        import pyperclip
+        
+        pyperclip.copy(text)
+    
+    def _chunks(self, text):
+        chunk = ""
+        for char in text:
+            if len((chunk + char).encode("utf-16-le")) // 2 > self.MAX_EVENT_UNITS:
+                yield chunk
+                chunk = ""
+            chunk += char
+        if chunk:
+            yield chunk
+    
+    def _post(self, erase, text):
+        import Quartz
+        
+        def key(code, chars=None):
+            for down in (True, False):
+                event = Quartz.CGEventCreateKeyboardEvent(None, code, down)
+                Quartz.CGEventSetFlags(event, 0)
+                if chars:
+                    Quartz.CGEventKeyboardSetUnicodeString(event, len(chars.encode("utf-16-le")) // 2, chars)
+                Quartz.CGEventPost(Quartz.kCGSessionEventTap, event)
+        
+        for _ in range(erase):
+            key(self.DELETE_KEY)
+        for chunk in self._chunks(text):
+            key(0, chunk)
+
+class ClipboardPasteSink(OutputSink):
+    """Copy to the clipboard and paste at the cursor (macOS)
+    
+    The previous clipboard contents are put back once the paste is seen
+    to land in the focused element.
+    """
+    
+    def __init__(self, restore=True):
+        self.restore = restore
+    
+    def write(self, text):
+        import pyperclip
+        
+        # Copy to clipboard
+        with METRICS.span("clipboard"):
+            previous = pyperclip.paste() if self.restore else None
+            pyperclip.copy(text)
+        
+        with METRICS.span("paste"):
+            _wait_for_modifiers_released()
+            before = _focused_text()
+            pasted = self._paste(text)
+            if pasted and self.restore:
+                landed = _wait_for_change(before)
+                if landed:
+                    pyperclip.copy(previous)
+                elif landed is None:
+                    # Restoring before the app has read the pasteboard would paste the old contents
+                    logging.info("Can't confirm the paste, leaving the transcript on the clipboard")
+                else:
+                    logging.warning("Paste did not show up in the focused element")
+        return pasted
+    
+    def _paste(self, text):
+        """Send Cmd+V, trying several methods"""
+        from pynput import keyboard
+        from pynput.keyboard import Key
+        
+        # Method 1: pynput
+        try:
+            logging.info(f"Attempting pynput paste for: {text[:50]}...")
+            kb = keyboard.Controller()
+            with kb.pressed(Key.cmd):
+                kb.press('v')
+                kb.release('v')
+            logging.info("pynput paste succeeded")
+            return True
+        except Exception as e:
+            logging.warning(f"pynput paste failed: {e}")
+        
+        # Method 2: separate taps
+        try:
+            logging.info("Attempting second paste method...")
+            kb = keyboard.Controller()
+            kb.tap(Key.cmd, modifier=Key.cmd)  # Different approach
+            kb.tap('v')
+            logging.info("Second paste method succeeded")
+            return True
+        except Exception as e:
+            logging.warning(f"Second paste method failed: {e}")
+        
+        # Method 3: Direct keystroke
+        try:
+            logging.info("Attempting Quartz paste method...")
+            import Quartz
+
+            # Create key down event for Cmd+V
+            cmd_down = Quartz.CGEventCreateKeyboardEvent(None, 55, True)  # Cmd key
+            v_down = Quartz.CGEventCreateKeyboardEvent(None, 9, True)   # V key
+            v_up = Quartz.CGEventCreateKeyboardEvent(None, 9, False)
+            cmd_up = Quartz.CGEventCreateKeyboardEvent(None, 55, False)
+            
+            # Set Cmd modifier on V key events
+            Quartz.CGEventSetFlags(v_down, Quartz.kCGEventFlagMaskCommand)
+            Quartz.CGEventSetFlags(v_up, Quartz.kCGEventFlagMaskCommand)
+            
+            # Post events
+            Quartz.CGEventPost(Quartz.kCGHIDEventTap, cmd_down)
+            Quartz.CGEventPost(Quartz.kCGHIDEventTap, v_down)
+            Quartz.CGEventPost(Quartz.kCGHIDEventTap, v_up)
+            Quartz.CGEventPost(Quartz.kCGHIDEventTap, cmd_up)
+            
+            logging.info("Quartz paste succeeded")
+            return True
+        except Exception as e:
+            logging.warning(f"Quartz paste failed: {e}")
+        
+        logging.warning("All paste methods failed - text copied to clipboard")
+        return False
+
+def make_sink(config):
+    """The macOS output sink selected by config["output"]"""
+    if config["output"] == "type":
+        return TypingSink()
+    return ClipboardPasteSink(restore=config["restore_clipboard"])
+
+class IncrementalOutput:
+    """What has been typed so far for one recording"""
+    
+    def __init__(self, sink):
+        self.sink = sink
+        self.typed = ""
+        self._lock = threading.Lock()
+    
+    def update(self, text, final=False):
+        """Bring the typed text in line with the latest transcript"""
+        with self._lock:
+            try:
+                confirmed = self.sink.update(self.typed, text, final)
+            except Exception:
+                return False
+            # The keys are out even if the app hasn't shown them yet; retyping would duplicate them
+            self.typed = text
+            return confirmed
+
+class DictationJob:
+    """One stopped recording waiting for, or going through, transcription"""
+    
+    def __init__(self, id, buffer, streamer, trace, stopped, duration, output=None):
+        self.id = id
+        self.buffer = buffer  # Owned by the job until it is done
+        self.streamer = streamer
+        self.output = output  # IncrementalOutput when partials are typed as they arrive
+        self.trace = trace
+        self.stopped = stopped
+        self.duration = duration
+        self.wait = 0.0  # Seconds spent queued behind earlier jobs
+        self.text = ""
+        self.delivered = False
+        self.error = None
+
+class DictationPipeline:
+    """Recorder → transcriber → output sink, independent of any UI
+    
+    Live dictations go through submit(): each stopped recording becomes a
+    job with its own buffer, so the next recording can start right away,
+    and a single worker thread transcribes and delivers jobs in order.
+    """
+    
+    def __init__(self, config, sink, recorder=None, transcriber=None, on_done=None, history=None, archive=None):
+        self.config = config
+        self.sink = sink
+        self.history = history  # Optional HistoryStore; add() must not block
+        self.archive = archive  # Optional AudioArchive for history entries; encodes in the background
+        self.recorder = recorder or Recorder(native=config["native_capture"])
+        self.transcriber = transcriber or Transcriber(config, self.recorder.rate)
+        self.on_done = on_done  # Called with each finished DictationJob, on the worker thread
+        self.streamer = None
+        self.trace = None
+        self.output = None
+        self._stopped = 0.0
+        self._job = None  # The job between finish() and deliver()
+        self._job_ids = itertools.count(1)
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+    
+    @property
+    def is_recording(self):
+        return self.recorder.is_recording
+    
+    @property
+    def pending(self):
+        """Jobs submitted but not yet delivered"""
+        return self._pending
+    
+    @property
+    def partial_text(self):
+        """Transcript of the current recording so far, when streaming"""
+        streamer = self.streamer
+        return streamer.text if streamer else ""
+    
+    def start(self):
+        """Start capturing, and streaming windows to the model if enabled"""
+        self.recorder.start()
+        self.trace = METRICS.begin()
+        if self.transcriber.engine_key != self.transcriber.target_key():
+            # Unloaded or shrunk: reload while the user is already speaking
+            self.transcriber.load_in_background()
+        else:
+            # Re-warm a cold model while the user is still speaking
+            self.transcriber.warm_if_idle()
+        # Decode windows while recording so only the tail is left on stop
+        if self.config["streaming"]:
+            # Type partials as they arrive, unless earlier dictations still have to go first
+            if self.sink.incremental and not self.pending:
+                self.output = IncrementalOutput(self.sink)
+            on_text = self.output.update if self.output else None
+            with METRICS.tracing(self.trace):
+                self.streamer = self.transcriber.stream(self.recorder.buffer, on_text)
+    
+    def stop(self):
+        """Stop capturing; call finish() afterwards to get the text"""
+        with METRICS.tracing(self.trace):
+            self.recorder.stop()
+        self._stopped = time.perf_counter()
+    
+    def watch_idle(self, interval=60):
+        """Periodically unload the model when idle or under memory pressure"""
+        def run():
+            while True:
+                time.sleep(interval)
+                # Queued jobs are about to need the model
+                if not self.is_recording and not self.pending:
+                    self.transcriber.check_idle()
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def _take_job(self, detach):
+        """Package the current recording, its streamer and trace as a job"""
+        buffer = self.recorder.detach() if detach else self.recorder.buffer
+        job = DictationJob(
+            next(self._job_ids), buffer, self.streamer, self.trace,
+            self._stopped, buffer.written / self.recorder.rate, self.output,
+        )
+        self.streamer = None
+        self.trace = None
+        self.output = None
+        return job
+    
+    def submit(self):
+        """Queue the stopped recording for transcription; recording can restart at once"""
+        job = self._take_job(detach=True)
+        with self._pending_lock:
+            self._pending += 1
+            depth = self._pending
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run_jobs, daemon=True)
+            self._worker.start()
+        self._jobs.put(job)
+        logging.info(f"Queued dictation #{job.id} ({job.duration:.1f}s), queue depth {depth}")
+        return job
+    
+    def _run_jobs(self):
+        """Transcribe and deliver submitted jobs one at a time, in order"""
+        while True:
+            job = self._jobs.get()
+            # Spans recorded while handling this job belong to its trace only
+            with METRICS.tracing(job.trace):
+                job.wait = time.perf_counter() - job.stopped
+                METRICS.observe("queue_wait", job.wait)
+                if job.wait > 0.1:
+                    logging.info(f"Dictation #{job.id} waited {job.wait:.2f}s in the queue")
+                try:
+                    job.text = self._transcribe(job)
+                    job.delivered = self._deliver(job, job.text)
+                except Exception as e:
+                    logging.error(f"Dictation #{job.id} failed: {e}")
+                    job.error = e
+                finally:
+                    self.recorder.release(job.buffer)
+                    with self._pending_lock:
+                        self._pending -= 1
+            if self.on_done:
+                self.on_done(job)
+    
+    def finish(self):
+        """Transcribe what was captured and return the text"""
+        self._job = self._take_job(detach=False)
+        with METRICS.tracing(self._job.trace):
+            return self._transcribe(self._job)
+    
+    def _transcribe(self, job):
+        streamer, job.streamer = job.streamer, None
+        if not job.buffer.written:
+            if streamer:
+                streamer.finish()
+            return ""
+        
+        if self.transcriber.engine is None:
+            # Unloaded while this job sat in the queue
+            self.transcriber.load_in_background()
+        self.transcriber.wait_ready()
+        if streamer:
+            # Only the audio after the last streamed window still needs decoding
+            text = streamer.finish().strip()
+            if not streamer.failed:
+                return text
+            logging.warning("Streaming transcription incomplete, decoding full recording")
+        
+        audio = self.recorder.audio(job.buffer)
+        if self.config["longform"] and len(audio) > self.config["longform_threshold_seconds"] * self.recorder.rate:
+            try:
+                return self.transcriber.transcribe_long(audio)
+            except Exception as e:
+                logging.error(f"Long-form decode failed, falling back to a single pass: {e}")
+        return self.transcriber.transcribe(audio)
+    
+    def deliver(self, text):
+        """Send text to the sink and close the request's metrics trace"""
+        job, self._job = self._job or self._take_job(detach=False), None
+        with METRICS.tracing(job.trace):
+            return self._deliver(job, text)
+    
+    def _deliver(self, job, text):
+        if job.output:
+            # Only the difference from what was typed while recording is left
+            delivered = job.output.update(text, final=True) and bool(text)
+        else:
+            delivered = bool(text) and self.sink.write(text)
+        latency = time.perf_counter() - job.stopped
+        METRICS.observe("stop_to_output", latency)
+        if job.trace:
+            METRICS.end(
+                job.trace,
+                model=self.config["model"],
+                engine=self.config["engine"],
+                audio_seconds=round(job.duration, 3),
+                latency=round(latency, 4),
+                queue_wait=round(job.wait, 4),
+                chars=len(text),
+                delivered=delivered,
+            )
+            job.trace = None
+        if self.history and text:
+            engine, model = (self.transcriber.engine_key or self.transcriber.configured_key())[:2]
+            # Copied before the buffer is released, encoded after the text is already out
+            audio = self.archive.add(self.recorder.audio(job.buffer), self.recorder.rate) if self.archive else None
+            self.history.add(
+                text,
+                duration=round(job.duration, 3),
+                engine=engine,
+                model=model,
+                language=self.config["language"] or self.transcriber.language,
+                latency=round(latency, 4),
+                delivered=delivered,
+                audio=audio,
+            )
+        return delivered
+    
+    def transcribe_file(self, path):
+        """Run a pre-recorded file through the same path as a live recording"""
+        self.recorder.load(load_audio(path))
+        self._stopped = time.perf_counter()
+        return self.finish()
+
+def main(argv=None):
+    """Transcribe files (or a timed recording) without any UI"""
+    parser = argparse.ArgumentParser(description="Headless Transcrybe pipeline")
+    parser.add_argument("files", nargs="*", help="Audio files to transcribe")
+    parser.add_argument("--record", type=float, metavar="SECONDS",
+                        help="Record from the default microphone for SECONDS instead")
+    parser.add_argument("--engine", help="Override the configured engine")
+    parser.add_argument("--model", help="Override the configured model")
+    parser.add_argument("--no-vad", action="store_true", help="Do not trim silence")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streaming while recording")
+    args = parser.parse_args(argv)
+    
+    if not args.files and args.record is None:
+        parser.error("give audio files or --record SECONDS")
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+    
+    config = load_config()
+    if args.engine:
+        config["engine"] = args.engine
+    if args.model:
+        config["model"] = args.model
+    if args.no_vad:
+        config["vad"] = False
+    if args.no_stream:
+        config["streaming"] = False
+    
+    pipeline = DictationPipeline(config, StdoutSink())
+    pipeline.transcriber.load()
+    
+    if args.record is not None:
+        pipeline.start()
+        time.sleep(args.record)
+        pipeline.stop()
+        start = time.perf_counter()
+        pipeline.deliver(pipeline.finish())
+        logging.info(f"Stop-to-text latency: {time.perf_counter() - start:.3f}s")
+    
+    for path in args.files:
+        start = time.perf_counter()
+        pipeline.deliver(pipeline.transcribe_file(path))
+        logging.info(f"{path}: {time.perf_counter() - start:.3f}s")
+    
+    for stage, stats in METRICS.summary().items():
+        logging.info(f"{stage}: p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s over {stats['count']} spans")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Pluggable speech-to-text engines
+
+Every engine takes 16 kHz mono float32 audio and returns the same result
+shape as `whisper.Whisper.transcribe`: a dict with "text", "segments"
+(each with "start", "end", "text") and "language". Options use Whisper's
+keyword names; engines translate or ignore the ones they don't support.
+
+Backends other than the default PyTorch Whisper are optional
+dependencies and are only imported when selected.
+
+The extra "short_context" option asks for the short-utterance path:
+instead of padding every clip to Whisper's 30-second window, the encoder
+only sees the clip plus a second of padding. Engines that can't do this
+ignore it.
+"""
+
+import logging
+import time
+import types
+
+FULL_AUDIO_CTX = 1500  # Encoder frames in a 30-second window
+SAMPLES_PER_AUDIO_CTX = 320  # 10 ms mel hop, halved again by the encoder's strided conv
+
+
+def short_audio_ctx(samples, margin=50):
+    """Encoder frames needed for `samples` of 16 kHz audio plus `margin` (1s)"""
+    return min(FULL_AUDIO_CTX, -(-samples // SAMPLES_PER_AUDIO_CTX) + margin)
+
+
+def _encoder_forward(self, x):
+    """AudioEncoder.forward that also accepts mel shorter than 30 seconds"""
+    import torch.nn.functional as F
+
+    x = F.gelu(self.conv1(x))
+    x = F.gelu(self.conv2(x))
+    x = x.permute(0, 2, 1)
+    x = (x + self.positional_embedding[:x.shape[1]]).to(x.dtype)
+    for block in self.blocks:
+        x = block(x)
+    return self.ln_post(x)
+
+
+class TranscriptionEngine:
+    """Base class for speech-to-text backends
+
+    When no "language" option is given, engines that can tell how sure
+    their language detection was add a "language_probability" to the
+    result.
+    """
+
+    name = None
+
+    def __init__(self, model_name="base", compute_type=None, threads=0):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.threads = threads
+
+    def transcribe(self, audio, **options):
+        """Transcribe audio and return a Whisper-style result dict"""
+        raise NotImplementedError
+
+    def warmup(self, **options):
+        """Run a throwaway pass so lazy initialization happens now
+
+        Thread pools, first-call allocations and the mel filterbank are all
+        set up on first use, which would otherwise land on the first real
+        dictation.
+        """
+        import numpy as np
+
+        # A single fixed temperature, so silence doesn't trigger the fallback schedule
+        options["temperature"] = 0.0
+        self.transcribe(np.zeros(16000, dtype=np.float32), **options)
+
+
+class WhisperEngine(TranscriptionEngine):
+    """Reference openai-whisper backend running on PyTorch
+
+    Results carry a "timings" dict splitting the call into encoder time
+    and everything else (mel, language detection decode, token decode).
+
+    Short clips are decoded in a single window whose length follows the
+    clip, through an encoder whose positional embedding is sliced to fit.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_name="base", compute_type=None, threads=0):
+        super().__init__(model_name, compute_type, threads)
+        import torch
+        import whisper
+
+        # Pin the intra-op thread count so every calling thread decodes the same way
+        self._torch = torch
+        self.threads = threads or torch.get_num_threads()
+        torch.set_num_threads(self.threads)
+        self.model = whisper.load_model(model_name)
+
+        # Time the audio encoder with forward hooks
+        self._encode_seconds = 0.0
+        self._encode_started = 0.0
+        self.model.encoder.register_forward_pre_hook(self._encoder_started)
+        self.model.encoder.register_forward_hook(self._encoder_finished)
+        self.model.encoder.forward = types.MethodType(_encoder_forward, self.model.encoder)
+
+    def _encoder_started(self, module, inputs):
+        self._encode_started = time.perf_counter()
+
+    def _encoder_finished(self, module, inputs, output):
+        self._encode_seconds += time.perf_counter() - self._encode_started
+
+    def _mel(self, audio, audio_ctx=FULL_AUDIO_CTX):
+        import whisper
+
+        audio = whisper.pad_or_trim(audio, audio_ctx * SAMPLES_PER_AUDIO_CTX)
+        return whisper.log_mel_spectrogram(audio, self.model.dims.n_mels).to(self.model.device)
+
+    def detect_language(self, audio, mel=None):
+        """Return the most likely language of the first 30s and its probability"""
+        mel = self._mel(audio) if mel is None else mel
+        _, probabilities = self.model.detect_language(mel)
+        language = max(probabilities, key=probabilities.get)
+        return language, probabilities[language]
+
+    def _transcribe_short(self, audio, **options):
+        """Decode a short clip in one window sized to the clip"""
+        import whisper
+
+        mel = self._mel(audio, short_audio_ctx(len(audio)))
+        probability = None
+        if not options.get("language"):
+            options["language"], probability = self.detect_language(audio, mel)
+
+        temperatures = options.get("temperature", 0.0)
+        if not isinstance(temperatures, (list, tuple)):
+            temperatures = (temperatures,)
+        # Same fallback and no-speech rules as Whisper's transcribe()
+        for temperature in temperatures:
+            decode_options = whisper.DecodingOptions(
+                task="transcribe",
+                language=options["language"],
+                temperature=temperature,
+                beam_size=options.get("beam_size") if temperature == 0 else None,
+                prompt=options.get("initial_prompt"),
+                without_timestamps=True,
+                fp16=bool(options.get("fp16")) and self.model.device.type == "cuda",
+            )
+            decoded = whisper.decode(self.model, mel, decode_options)
+            # Silence isn't retried at a higher temperature, which would only invent words
+            silent = decoded.no_speech_prob > 0.6 and decoded.avg_logprob <= -1.0
+            if silent or (decoded.compression_ratio <= 2.4 and decoded.avg_logprob >= -1.0):
+                break
+
+        result = {
+            "text": "" if silent else decoded.text,
+            "segments": [] if silent else [{
+                "start": 0.0,
+                "end": len(audio) / 16000,
+                "text": decoded.text,
+                "avg_logprob": decoded.avg_logprob,
+            }],
+            "language": options["language"],
+        }
+        if probability is not None:
+            result["language_probability"] = probability
+        return result
+
+    def transcribe(self, audio, short_context=False, **options):
+        if self._torch.get_num_threads() != self.threads:
+            self._torch.set_num_threads(self.threads)
+        self._encode_seconds = 0.0
+        start = time.perf_counter()
+        probability = None
+        if not options.get("language"):
+            if not self.model.is_multilingual:
+                options["language"] = "en"
+            elif not short_context:
+                # Detect here rather than inside transcribe() to learn the probability
+                options["language"], probability = self.detect_language(audio)
+        if short_context:
+            result = self._transcribe_short(audio, **options)
+        else:
+            result = self.model.transcribe(audio, **options)
+            if probability is not None:
+                result["language_probability"] = probability
+        elapsed = time.perf_counter() - start
+        result["timings"] = {
+            "encode": self._encode_seconds,
+            "decode": elapsed - self._encode_seconds,
+        }
+        return result
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """CTranslate2 backend via faster-whisper, int8 on CPU by default"""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name="base", compute_type=None, threads=0):
+        super().__init__(model_name, compute_type or "int8", threads)
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=threads,
+        )
+
+    def transcribe(self, audio, **options):
+        segments, info = self.model.transcribe(
+            audio,
+            language=options.get("language"),
+            initial_prompt=options.get("initial_prompt"),
+            beam_size=options.get("beam_size") or 1,
+            temperature=options.get("temperature", 0.0),
+        )
+        segments = [
+            {"start": segment.start, "end": segment.end, "text": segment.text,
+             "avg_logprob": segment.avg_logprob}
+            for segment in segments
+        ]
+        result = {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+        if not options.get("language"):
+            result["language_probability"] = info.language_probability
+        return result
+
+
+class WhisperCppEngine(TranscriptionEngine):
+    """whisper.cpp backend via the pywhispercpp bindings"""
+
+    name = "whisper.cpp"
+
+    def __init__(self, model_name="base", compute_type=None, threads=0):
+        super().__init__(model_name, compute_type, threads)
+        from pywhispercpp.model import Model
+
+        params = {"n_threads": threads} if threads else {}
+        self.model = Model(model_name, print_progress=False, **params)
+
+    def transcribe(self, audio, **options):
+        params = {}
+        if options.get("short_context"):
+            params["audio_ctx"] = short_audio_ctx(len(audio))
+        if options.get("language"):
+            params["language"] = options["language"]
+        if options.get("initial_prompt"):
+            params["initial_prompt"] = options["initial_prompt"]
+
+        # whisper.cpp reports timestamps in centiseconds
+        segments = [
+            {"start": segment.t0 / 100, "end": segment.t1 / 100, "text": segment.text}
+            for segment in self.model.transcribe(audio, **params)
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": options.get("language"),
+        }
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (WhisperEngine, FasterWhisperEngine, WhisperCppEngine)
+}
+
+def load_engine(engine="whisper", model_name="base", compute_type=None, threads=0):
+    """Instantiate an engine by name, loading its model"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    logging.info(f"Loading {engine} engine with model '{model_name}'...")
+    return ENGINES[engine](model_name, compute_type=compute_type, threads=threads)
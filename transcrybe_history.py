@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Searchable history of dictated transcripts
+
+Every delivered transcript is stored in a local SQLite database together
+with when it was spoken, how long it was, the model that decoded it and
+the stop-to-text latency and, when audio archiving is on, the name of
+the archived recording. An FTS5 index makes full-text search fast even
+over hundreds of thousands of entries. Writes are queued and committed in
+batches by a background thread, so recording a result never delays the
+paste.
+
+    transcrybe history "quarterly report"
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+HISTORY_PATH = os.path.expanduser("~/Library/Application Support/Transcrybe/history.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    text TEXT NOT NULL,
+    duration REAL,
+    engine TEXT,
+    model TEXT,
+    language TEXT,
+    latency REAL,
+    delivered INTEGER,
+    audio TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(text, content='entries', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF text ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO entries_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+COLUMNS = ("created", "text", "duration", "engine", "model", "language", "latency", "delivered", "audio")
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching all words, the last as a prefix"""
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+class HistoryStore:
+    """SQLite + FTS5 transcript history with a background writer"""
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        if os.path.dirname(path):  # A bare file name lives in the working directory
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection for reads and updates, shared across threads under a lock
+        self._db = self._connect()
+        self._db_lock = threading.Lock()
+        with self._db:
+            self._db.executescript(SCHEMA)
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(entries)")}
+            if "audio" not in columns:  # Databases from before audio archiving
+                self._db.execute("ALTER TABLE entries ADD COLUMN audio TEXT")
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")  # Readers never wait for the writer
+        return db
+
+    def add(self, text, **fields):
+        """Queue one transcript for storage; returns immediately"""
+        fields.setdefault("created", time.time())
+        fields["text"] = text
+        self._queue.put(fields)
+
+    def flush(self):
+        """Block until every queued entry has been written"""
+        self._queue.join()
+
+    def _write_loop(self):
+        """Commit queued entries, batching whatever has piled up"""
+        db = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with db:
+                    db.executemany(
+                        f"INSERT INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        [tuple(entry.get(column) for column in COLUMNS) for entry in batch],
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"Failed to write {len(batch)} history entries: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+    def search(self, text, limit=20):
+        """Newest entries containing every word of `text`"""
+        return self._query(
+            "SELECT entries.* FROM entries JOIN ("
+            "  SELECT rowid FROM entries_fts WHERE entries_fts MATCH ? ORDER BY rowid DESC LIMIT ?"
+            ") AS hits ON entries.id = hits.rowid ORDER BY entries.id DESC",
+            (fts_query(text), limit),
+        )
+
+    def recent(self, limit=20):
+        """The newest entries"""
+        return self._query("SELECT * FROM entries ORDER BY id DESC LIMIT ?", (limit,))
+
+    def with_audio(self, limit=None):
+        """The newest entries that have an archived recording"""
+        return self._query(
+            "SELECT * FROM entries WHERE audio IS NOT NULL ORDER BY id DESC LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+
+    def update(self, entry_id, **fields):
+        """Change stored fields of one entry, e.g. after re-transcribing it"""
+        names = [name for name in fields if name in COLUMNS]
+        with self._db_lock, self._db:
+            self._db.execute(
+                f"UPDATE entries SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+                (*(fields[name] for name in names), entry_id),
+            )
+
+    def count(self):
+        return self._query("SELECT COUNT(*) AS n FROM entries")[0]["n"]
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return [dict(row) for row in self._db.execute(sql, params).fetchall()]
+
+
+def format_entry(entry):
+    """One-line summary of an entry for menus and the terminal"""
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created"]))
+    return f"{when}  {entry['text']}"
+
+def main(argv=None):
+    """Search or list the transcript history"""
+    parser = argparse.ArgumentParser(prog="transcrybe history", description="Search past transcripts")
+    parser.add_argument("query", nargs="*", help="Words to search for (omit to list the latest)")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="Maximum number of entries")
+    parser.add_argument("--json", action="store_true", help="Print entries as JSON lines")
+    parser.add_argument("--db", default=HISTORY_PATH, help="History database")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        sys.exit(f"No history at {args.db}")
+    store = HistoryStore(args.db)
+    start = time.perf_counter()
+    # An empty MATCH is an FTS5 syntax error, so blank queries list the latest instead
+    query = " ".join(args.query).strip()
+    entries = store.search(query, args.limit) if query else store.recent(args.limit)
+    elapsed = time.perf_counter() - start
+
+    for entry in entries:
+        print(json.dumps(entry) if args.json else format_entry(entry))
+    print(f"{len(entries)} entries in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
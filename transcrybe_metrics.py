@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency metrics for the dictation pipeline
+
+Stages record spans into process-wide histograms (`METRICS`). Spans are
+also collected into the request trace active in the current context (see
+Metrics.tracing), so each request can be appended to a JSONL file with
+its own timings even while several are in flight. Histograms can be served in Prometheus
+text format from a local HTTP endpoint.
+"""
+
+import bisect
+import contextvars
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+# Request trace that spans in this thread/context belong to
+_current_trace = contextvars.ContextVar("transcrybe_trace", default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent values for quantiles"""
+
+    def __init__(self, window=1000):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q):
+        """Quantile over the recent window, or None if empty"""
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RequestTrace:
+    """Spans recorded for one dictation request"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.spans = {}
+
+    def add(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+
+class Metrics:
+    """Registry of per-stage latency histograms"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.jsonl_path = None
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record one span for `stage`"""
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+            trace = _current_trace.get()
+            if trace:
+                trace.add(stage, seconds)
+
+    @contextmanager
+    def span(self, stage):
+        """Time the body of a with-block as `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def begin(self):
+        """Open a request trace; spans go into it inside tracing(trace)"""
+        return RequestTrace()
+
+    @contextmanager
+    def tracing(self, trace):
+        """Collect spans recorded in the body of a with-block into `trace`
+
+        The trace is bound to the current context, so other threads keep
+        their own. Threads started inside inherit it only when run in a
+        copy of the context (contextvars.copy_context().run).
+        """
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+
+    def end(self, trace, **fields):
+        """Close a request trace and append it to the JSONL file"""
+        if not self.jsonl_path:
+            return
+        spans = {stage: round(seconds, 6) for stage, seconds in trace.spans.items()}
+        record = {"time": trace.started, **fields, "spans": spans}
+        try:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logging.warning(f"Failed to write metrics to {self.jsonl_path}: {e}")
+
+    def summary(self):
+        """Return {stage: {"count", "p50", "p95"}} for every stage seen"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.50),
+                    "p95": histogram.quantile(0.95),
+                }
+                for stage, histogram in sorted(self.histograms.items())
+            }
+
+    def to_prometheus(self):
+        """Render all histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP transcrybe_stage_seconds Time spent in each dictation stage",
+            "# TYPE transcrybe_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'transcrybe_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'transcrybe_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'transcrybe_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a local port from a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Metrics endpoint at http://{host}:{port}/metrics")
+        return server
+
+
+class StartupProfile:
+    """Wall-clock phases from process start until the app is usable"""
+
+    def __init__(self, started=None):
+        self.started = started or time.perf_counter()
+        self.marks = []
+
+    def mark(self, phase):
+        """Record that `phase` just finished"""
+        self.marks.append((phase, time.perf_counter()))
+
+    def phases(self):
+        """Return [(phase, seconds it took)] in order"""
+        previous = self.started
+        phases = []
+        for phase, at in self.marks:
+            phases.append((phase, at - previous))
+            previous = at
+        return phases
+
+    def report(self):
+        total = self.marks[-1][1] - self.started if self.marks else 0.0
+        lines = [f"Startup took {total:.3f}s:"]
+        lines += [f"  {phase:<20} {seconds:.3f}s" for phase, seconds in self.phases()]
+        return "\n".join(lines)
+
+
+def import_times(module, limit=15):
+    """Import `module` in a fresh interpreter under -X importtime
+
+    Returns the `limit` slowest imports as (name, self seconds,
+    cumulative seconds), slowest cumulative first.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports.append((fields[2].strip(), int(fields[0]) / 1e6, int(fields[1]) / 1e6))
+    imports.sort(key=lambda entry: entry[2], reverse=True)
+    return imports[:limit]
+
+
+METRICS = Metrics()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Long-lived Whisper worker that keeps models warm across app restarts
+
+The menu bar app (or any other front-end) connects over a Unix domain
+socket and sends float32 audio; the worker answers with the same result
+dict that `whisper.Whisper.transcribe` returns. Models are loaded through
+`transcrybe_engines`, so any engine can be served.
+
+Wire format, in both directions: a 4-byte big-endian header length, a
+JSON header, then `header["payload"]` bytes of raw data (float32 samples
+for transcribe requests).
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from transcrybe_engines import load_engine
+
+SOCKET_PATH = os.environ.get(
+    "TRANSCRYBE_WORKER_SOCKET",
+    os.path.expanduser("~/Library/Application Support/Transcrybe/worker.sock"),
+)
+
+_HEADER = struct.Struct(">I")
+
+
+def _recv_exact(sock, size):
+    """Read exactly `size` bytes or raise ConnectionError"""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("Worker connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+def _json_default(value):
+    """Serialize numpy scalars that sneak into Whisper results"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def send_message(sock, header, payload=b""):
+    """Send one framed message"""
+    header = dict(header, payload=len(payload))
+    encoded = json.dumps(header, default=_json_default).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+def recv_message(sock):
+    """Receive one framed message as (header, payload)"""
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, length).decode("utf-8"))
+    payload = _recv_exact(sock, header.get("payload", 0))
+    return header, payload
+
+
+class WorkerClient:
+    """Drop-in stand-in for a loaded engine, backed by the worker"""
+
+    def __init__(self, model_name="base", engine="whisper", compute_type=None,
+                 path=SOCKET_PATH, timeout=300):
+        self.model_name = model_name
+        self.engine = engine
+        self.compute_type = compute_type
+        self.path = path
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, model_name="base", engine="whisper", compute_type=None, path=SOCKET_PATH):
+        """Return a client if a worker is listening at `path`, else None"""
+        if not os.path.exists(path):
+            return None
+        client = cls(model_name, engine, compute_type, path)
+        try:
+            client.ping()
+        except OSError as e:
+            logging.info(f"Transcription worker at {path} not reachable: {e}")
+            return None
+        return client
+
+    def _request(self, header, payload=b""):
+        """Send one request and return the response header"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            send_message(sock, header, payload)
+            response, _ = recv_message(sock)
+        if not response.get("ok"):
+            raise RuntimeError(f"Worker error: {response.get('error')}")
+        return response
+
+    def ping(self):
+        """Check the worker is alive and list the models it has loaded"""
+        return self._request({"op": "ping"}).get("models", [])
+
+    def transcribe(self, audio, **options):
+        """Transcribe 16 kHz mono float32 audio in the worker"""
+        import numpy as np
+
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        header = {
+            "op": "transcribe",
+            "engine": self.engine,
+            "model": self.model_name,
+            "compute_type": self.compute_type,
+            "options": options,
+        }
+        return self._request(header, audio.tobytes())["result"]
+
+    def warmup(self, **options):
+        """Ask the worker for a throwaway pass, e.g. after a long idle period"""
+        import numpy as np
+
+        options["temperature"] = 0.0
+        self.transcribe(np.zeros(16000, dtype=np.float32), **options)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serve requests from one front-end connection"""
+
+    def handle(self):
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                response = self.server.dispatch(header, payload)
+                response["ok"] = True
+            except Exception as e:
+                logging.error(f"Worker request failed: {e}")
+                response = {"ok": False, "error": str(e)}
+            send_message(self.request, response)
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server holding loaded engines in memory"""
+
+    daemon_threads = True
+
+    def __init__(self, path=SOCKET_PATH, threads=0):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)  # Stale socket from a previous run
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+        self.path = path
+        self.threads = threads
+        self.models = {}
+        self._model_locks = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, name, engine="whisper", compute_type=None):
+        """Return a loaded engine and its lock, loading it on first use"""
+        key = f"{engine}:{name}:{compute_type or 'default'}"
+        with self._lock:
+            if key not in self.models:
+                self.models[key] = load_engine(engine, name, compute_type, self.threads)
+                self._model_locks[key] = threading.Lock()
+                start = time.perf_counter()
+                self.models[key].warmup()
+                logging.info(f"Loaded {key}, warm-up took {time.perf_counter() - start:.2f}s")
+            return self.models[key], self._model_locks[key]
+
+    def dispatch(self, header, payload):
+        """Handle one decoded request"""
+        import numpy as np
+
+        op = header.get("op")
+        if op == "ping":
+            return {"models": sorted(self.models)}
+        if op == "transcribe":
+            model, lock = self.get_model(
+                header.get("model", "base"),
+                header.get("engine", "whisper"),
+                header.get("compute_type"),
+            )
+            audio = np.frombuffer(payload, dtype=np.float32)
+            # Engines are not thread-safe (Whisper installs per-call hooks), so decode one at a time
+            with lock:
+                result = model.transcribe(audio, **header.get("options", {}))
+            return {"result": result}
+        raise ValueError(f"Unknown op: {op}")
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def main():
+    """Run the transcription worker until interrupted"""
+    parser = argparse.ArgumentParser(description="Transcrybe model worker")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path to listen on")
+    parser.add_argument("--model", default="base", help="Model to load at startup")
+    parser.add_argument("--engine", default="whisper", help="Engine for the startup model")
+    parser.add_argument("--compute-type", default=None, help="Engine compute type, e.g. int8")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per engine, 0 = default")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    server = WorkerServer(args.socket, args.threads)
+    server.get_model(args.model, args.engine, args.compute_type)
+    logging.info(f"Transcription worker listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()